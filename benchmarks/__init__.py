@@ -0,0 +1,78 @@
+"""
+Benchmarks for veripy
+
+Each benchmark is a function, registered using the benchmark decorator, that takes a
+parameter and returns a callable that performs the operation being timed
+The suite is run with python -m benchmarks, which writes the results as JSON so that runs
+can be compared
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import collections, timeit, platform, sys, time
+
+
+# The registered benchmarks, in the order that they were registered
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name, params = (None, )):
+    """
+    Decorator that registers a benchmark with the given name, which is run once for each
+    of the given parameters
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, tuple(params))
+        return setup
+    return decorator
+
+
+def time_call(func, repeat = 5, mintime = 0.2):
+    """
+    Times func and returns a dict containing the number of calls per repetition and the best
+    and median times per call in seconds
+    """
+    timer = timeit.Timer(func)
+    # Choose the number of calls so that each repetition takes at least mintime
+    number = 1
+    while timer.timeit(number) < mintime:
+        number *= 2 if number < 10 else 10
+    times = sorted(t / number for t in timer.repeat(repeat, number))
+    return { 'number' : number, 'best' : times[0], 'median' : times[len(times) // 2] }
+
+
+def run(select = None, repeat = 5, mintime = 0.2, report = None):
+    """
+    Runs the registered benchmarks whose names contain one of the given strings, or all of
+    them if select is not given, and returns the results as a dict
+
+    If given, report is called with the name and result of each benchmark as it completes
+    """
+    results = collections.OrderedDict()
+    for name, (setup, params) in BENCHMARKS.items():
+        if select and not any(s in name for s in select):
+            continue
+        for param in params:
+            key = name if param is None else '%s[%s]' % (name, param)
+            results[key] = time_call(setup(param), repeat, mintime)
+            if report:
+                report(key, results[key])
+    return {
+        'timestamp' : time.time(),
+        'python'    : sys.version,
+        'platform'  : platform.platform(),
+        'results'   : results,
+    }
+
+
+def compare(old, new):
+    """
+    Returns a list of (name, old best, new best, ratio) for the benchmarks in both sets
+    of results, where a ratio above 1 means that the new run is slower
+    """
+    comparison = []
+    for name, result in new['results'].items():
+        if name in old['results']:
+            before = old['results'][name]['best']
+            comparison.append((name, before, result['best'], result['best'] / before))
+    return comparison
@@ -0,0 +1,42 @@
+"""
+Runs the veripy benchmarks and writes the results as JSON
+
+Usage: python -m benchmarks [-o results.json] [-c old.json] [-k name] ...
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import argparse, json
+
+from . import run, compare
+from . import bench_verify, bench_types, bench_compile
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = 'python -m benchmarks',
+                                     description = 'Runs the veripy benchmarks')
+    parser.add_argument('-o', '--output', default = 'benchmarks.json',
+                        help = 'File to write the results to')
+    parser.add_argument('-k', '--select', action = 'append',
+                        help = 'Only run benchmarks whose names contain this string')
+    parser.add_argument('-r', '--repeat', type = int, default = 5,
+                        help = 'Number of repetitions of each benchmark')
+    parser.add_argument('-t', '--mintime', type = float, default = 0.2,
+                        help = 'Minimum time in seconds for each repetition')
+    parser.add_argument('-c', '--compare', help = 'Previous results to compare with')
+    args = parser.parse_args()
+    def report(name, result):
+        print('%-48s %10.3f us' % (name, result['best'] * 1e6))
+    results = run(args.select, args.repeat, args.mintime, report)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent = 2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print()
+        for name, before, after, ratio in compare(old, results):
+            print('%-48s %10.3f us %10.3f us %6.2fx' % (name, before * 1e6, after * 1e6, ratio))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmarks comparing compiled checkers with isinstance checks using the metaclasses
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import veripy
+from veripy.types import Union, Intersection
+from veripy.types.structural import Tuple, Record, HasAttrs, List
+from veripy.types.comparison import Ge, Le
+
+from . import benchmark
+
+
+class User:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+CASES = {
+    'union'    : (Union[int, str, None], 'x'),
+    'tuple'    : (Tuple[int, str, float], (1, 'a', 1.0)),
+    'interval' : (Intersection[int, Ge[0], Le[100]], 50),
+    'nested'   : (Record['user' : HasAttrs['id' : int, 'name' : str],
+                         'tags' : Tuple[str, ...],
+                         'scores' : List[Intersection[Ge[0], Le[1]]]],
+                  { 'user' : User(1, 'bob'), 'tags' : ('a', 'b'), 'scores' : [0.1, 0.5, 0.9] }),
+}
+
+
+@benchmark('compile.metaclass', sorted(CASES))
+def bench_metaclass(case):
+    t, value = CASES[case]
+    return lambda: isinstance(value, t)
+
+
+@benchmark('compile.compiled', sorted(CASES))
+def bench_compiled(case):
+    t, value = CASES[case]
+    check = veripy.compile(t)
+    return lambda: check(value)
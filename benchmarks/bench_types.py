@@ -0,0 +1,159 @@
+"""
+Benchmarks for instance checks and construction of the veripy types
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import functools
+
+from veripy.types import Union, Intersection, intern_table
+from veripy.types.structural import Tuple, Record, HasAttrs, Callable
+from veripy.types.comparison import Ge, Lt
+
+from . import benchmark
+
+
+SIZES = (2, 8, 32, 128)
+
+
+def _classes(n):
+    """
+    Returns n distinct classes
+    """
+    return tuple(type('C%d' % i, (), {}) for i in range(n))
+
+
+class Obj:
+    pass
+
+
+def _obj(n):
+    obj = Obj()
+    for i in range(n):
+        setattr(obj, 'f%d' % i, i)
+    return obj
+
+
+@benchmark('union.hit', SIZES)
+def bench_union_hit(n):
+    classes = _classes(n)
+    t, value = Union[classes], classes[-1]()
+    return lambda: isinstance(value, t)
+
+
+@benchmark('union.miss', SIZES)
+def bench_union_miss(n):
+    t = Union[_classes(n)]
+    return lambda: isinstance(1, t)
+
+
+@benchmark('union.intervals', SIZES)
+def bench_union_intervals(n):
+    t = Union[tuple(Intersection[Ge[2 * i], Lt[2 * i + 1]] for i in range(n))]
+    return lambda: isinstance(2 * n - 2, t)
+
+
+@benchmark('intersection.hit', SIZES)
+def bench_intersection_hit(n):
+    classes = _classes(n)
+    t, value = Intersection[classes], type('All', classes, {})()
+    return lambda: isinstance(value, t)
+
+
+@benchmark('intersection.miss', SIZES)
+def bench_intersection_miss(n):
+    t = Intersection[_classes(n)]
+    return lambda: isinstance(1, t)
+
+
+@benchmark('tuple', SIZES)
+def bench_tuple(n):
+    t, value = Tuple[(int, ) * n], tuple(range(n))
+    return lambda: isinstance(value, t)
+
+
+@benchmark('record', SIZES)
+def bench_record(n):
+    t = Record[tuple(slice('f%d' % i, int) for i in range(n))]
+    value = dict(('f%d' % i, i) for i in range(n))
+    return lambda: isinstance(value, t)
+
+
+@benchmark('hasattrs', SIZES)
+def bench_hasattrs(n):
+    t, value = HasAttrs[tuple(slice('f%d' % i, int) for i in range(n))], _obj(n)
+    return lambda: isinstance(value, t)
+
+
+@benchmark('hasattrs.slots', SIZES)
+def bench_hasattrs_slots(n):
+    names = tuple('f%d' % i for i in range(n))
+    value = type('Slots', (), { '__slots__' : names })()
+    for i, name in enumerate(names):
+        setattr(value, name, i)
+    t = HasAttrs[tuple(slice(name, int) for name in names)]
+    return lambda: isinstance(value, t)
+
+
+def annotated(a: int, b: str) -> float:
+    return 1.0
+
+
+def unannotated(a, b):
+    return 1.0
+
+
+class Methods:
+    def method(self, a: int, b: str) -> float:
+        return 1.0
+
+
+@benchmark('callable', ('annotated', 'unannotated', 'method', 'partial'))
+def bench_callable(kind):
+    t = Callable[int, str, float]
+    value = {
+        'annotated'   : annotated,
+        'unannotated' : unannotated,
+        'method'      : Methods().method,
+        'partial'     : functools.partial(annotated, b = 'b'),
+    }[kind]
+    return lambda: isinstance(value, t)
+
+
+# The constructors used for the construction benchmarks
+CONSTRUCTORS = {
+    'union'        : lambda classes: Union[classes],
+    'intersection' : lambda classes: Intersection[classes],
+    'tuple'        : lambda classes: Tuple[classes],
+    'record'       : lambda classes: Record[tuple(slice(c.__name__, c) for c in classes)],
+    'hasattrs'     : lambda classes: HasAttrs[tuple(slice(c.__name__, c) for c in classes)],
+    'callable'     : lambda classes: Callable[classes],
+}
+
+
+@benchmark('construct.interned', sorted(CONSTRUCTORS))
+def bench_construct_interned(kind):
+    construct, classes = CONSTRUCTORS[kind], _classes(8)
+    t = construct(classes)
+    # The type is kept alive by the closure, so the intern table returns it each time
+    return lambda: construct(classes) and t
+
+
+@benchmark('construct.fresh', sorted(CONSTRUCTORS))
+def bench_construct_fresh(kind):
+    construct, classes = CONSTRUCTORS[kind], _classes(8)
+    def fresh():
+        intern_table.clear()
+        return construct(classes)
+    return fresh
+
+
+@benchmark('construct.union_size', SIZES)
+def bench_construct_union_size(n):
+    # Half of the classes are subclasses of the other half, so the union must be reduced
+    roots = _classes(n // 2)
+    classes = roots + tuple(type('D%d' % i, (c, ), {}) for i, c in enumerate(roots))
+    def fresh():
+        intern_table.clear()
+        return Union[classes]
+    return fresh
@@ -0,0 +1,81 @@
+"""
+Benchmarks for the overhead of calling functions decorated with verify
+
+Each benchmark is run for the plain function and the verified function, so the overhead
+is the difference between the two
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+from veripy import verify
+
+from . import benchmark
+
+
+MODES = ('plain', 'verified')
+
+
+def positional(a: int, b: str, c: float) -> int:
+    return a
+
+
+def defaults(a: int, b: str = 'b', c: float = 1.0, d: int = 1, e: str = 'e',
+             f: float = 1.0, g: int = 1, h: str = 'h') -> int:
+    return a
+
+
+def variadic(a: int, *args: tuple, **kwargs: dict) -> int:
+    return a
+
+
+def unannotated(a, b, c):
+    return a
+
+
+def _function(f, mode):
+    return f if mode == 'plain' else verify(f)
+
+
+@benchmark('verify.positional', MODES)
+def bench_positional(mode):
+    f = _function(positional, mode)
+    return lambda: f(1, 'b', 1.0)
+
+
+@benchmark('verify.keyword', MODES)
+def bench_keyword(mode):
+    f = _function(positional, mode)
+    return lambda: f(1, c = 1.0, b = 'b')
+
+
+@benchmark('verify.defaults', MODES)
+def bench_defaults(mode):
+    f = _function(defaults, mode)
+    return lambda: f(1)
+
+
+@benchmark('verify.defaults_given', MODES)
+def bench_defaults_given(mode):
+    f = _function(defaults, mode)
+    return lambda: f(1, 'b', 1.0, 1, e = 'e', h = 'h')
+
+
+@benchmark('verify.variadic', MODES)
+def bench_variadic(mode):
+    f = _function(variadic, mode)
+    return lambda: f(1, 2, 3, x = 'x', y = 'y')
+
+
+@benchmark('verify.unannotated', MODES)
+def bench_unannotated(mode):
+    f = _function(unannotated, mode)
+    return lambda: f(1, 2, 3)
+
+
+@benchmark('verify.decorate')
+def bench_decorate(_):
+    # A local function is not added to the registry used by enable_all / disable_all, so
+    # repeated decoration does not leave entries behind
+    def local(a: int, b: str, c: float) -> int:
+        return a
+    return lambda: verify(local)
@@ -0,0 +1,40 @@
+"""
+Tests for the argument checks made by verify
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import unittest
+
+from veripy import verify
+
+
+class TestPositionalOnly(unittest.TestCase):
+    """
+    A positional-only parameter can share its name with a key in **kwargs, in which case the
+    positional argument is the one that is checked
+    """
+
+    def setUp(self):
+        @verify
+        def f(x: int, /, **kw):
+            return (x, kw)
+        self.f = f
+
+    def test_keyword_with_same_name_is_not_checked(self):
+        self.assertEqual(self.f(1, x = 'a'), (1, { 'x' : 'a' }))
+
+    def test_positional_is_checked(self):
+        with self.assertRaises(TypeError):
+            self.f('a', x = 1)
+
+    def test_positional_is_checked_for_each_shape(self):
+        self.assertEqual(self.f(1), (1, {}))
+        with self.assertRaises(TypeError):
+            self.f('a')
+        with self.assertRaises(TypeError):
+            self.f('a', x = 1, y = 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
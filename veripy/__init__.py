@@ -7,15 +7,320 @@ useful types, such as unions, intersections, dependent and existential types
 @author: Matt Pryor <mkjpryor@gmail.com>
 """
 
-import functools, inspect
+import builtins, collections.abc, functools, inspect, os, sys, weakref
 from inspect import Parameter as P, Signature as S
+from types import FunctionType
+
+from .sampling import SamplerTable
+from .types import TypeMeta
+from .types.structural import IterableMeta
+from .generators import generator_wrapper, coroutine_wrapper, async_generator_wrapper, \
+                        checked_generator, checked_async_generator
+from .validation import validate
+from .compiler import compile
+from .plans import PlanCache
+from . import instrumentation
 
 
 # Set this to False to disable type verification
 enabled = True
 
+# Set this to a sampling policy (see veripy.sampling) to only verify some of the calls to
+# functions that do not specify their own policy
+policy = None
+
+# Set this to True, or set the VERIPY_STRIP environment variable to 1, before functions are
+# decorated to make verify return them unchanged, so they have no overhead at all
+# Stripped functions can be verified later using enable_all
+strip = os.environ.get('VERIPY_STRIP', '0') not in ('', '0')
+
+
+# Set this to a PlanCache (see veripy.plans), or set the VERIPY_PLAN_CACHE environment
+# variable to the path of a file, to cache the plans for checking calls between runs
+plan_cache = PlanCache(os.environ['VERIPY_PLAN_CACHE']) if os.environ.get('VERIPY_PLAN_CACHE') \
+                 else None
+
+
+# The maximum number of call shapes for which a checker is compiled for each function
+# Calls with any other shape fall back to binding the arguments on every call
+MAX_SHAPES = 32
+
+
+def _is_lazy(t):
+    """
+    Returns True if t is a veripy type that checks some values lazily, by wrapping them
+    """
+    if not isinstance(t, TypeMeta) or not hasattr(type(t), 'wrap'):
+        return False
+    # Only iterables that admit iterators, e.g. Iterable[int] but not List[int], ever wrap
+    if isinstance(t, IterableMeta):
+        return t.__elementtype__ is not None and \
+               issubclass(collections.abc.Iterator, t.__container__)
+    return True
+
+
+def _fail(name, t, value):
+    """
+    Raises the error for an argument that does not match its type
+    """
+    raise TypeError("Incorrect type for %s - "
+                    "expected %s ; got: %s" % (name, repr(t), repr(type(value))))
+
+
+def _fail_return(t, value):
+    """
+    Raises the error for a return value that does not match the return type
+    """
+    raise TypeError("Incorrect return type - "
+                    "expected %s ; got: %s" % (repr(t), repr(type(value))))
+
+
+def _check_nothing(args, kwargs):
+    """
+    Checker used for call shapes where none of the bound arguments are annotated
+    """
+    pass
+
+
+def _check_bound(sig, argtypes, args, kwargs):
+    """
+    Binds the given args to sig and checks the bound arguments against argtypes
+    """
+    bound = sig.bind(*args, **kwargs)
+    for k, v in bound.arguments.items():
+        if k in argtypes and not isinstance(v, argtypes[k]):
+            _fail(k, argtypes[k], v)
+
+
+def _plan_checker(sig, argtypes, args, kwargs):
+    """
+    Returns the plan for a function that checks the arguments for calls with the same shape
+    as the given args and kwargs, i.e. the same number of positional arguments and the same
+    keyword arguments
+
+    The plan is a tuple of the compiled code for the checker, a map of the names of constants
+    that it uses to their values and a map of the names of the types it uses to parameter names,
+    or an empty tuple if there is nothing to check
+
+    The given arguments are bound to sig in order to decide where each argument comes from,
+    so a TypeError is raised if they cannot be bound
+    """
+    bound = sig.bind(*args, **kwargs)
+    params = sig.parameters
+    # Work out how many of the positional arguments are bound to named parameters
+    npositional = sum(1 for p in params.values() if p.kind in (P.POSITIONAL_ONLY,
+                                                                P.POSITIONAL_OR_KEYWORD))
+    positions = dict((k, j) for j, k in enumerate(params))
+    consts = {}
+    types = {}
+    lines = []
+    # Checks are generated in parameter order so that the first error is the same as
+    # when the bound arguments are checked in order
+    for i, k in enumerate(bound.arguments):
+        if k not in argtypes:
+            continue
+        kind = params[k].kind
+        if kind is P.VAR_POSITIONAL:
+            source = 'args[%d:]' % npositional
+        elif kind is P.VAR_KEYWORD:
+            consts['x%d' % i] = tuple(bound.arguments[k])
+            source = 'dict((n, kwargs[n]) for n in x%d)' % i
+        elif kind is not P.KEYWORD_ONLY and positions[k] < len(args):
+            # The source is decided by position rather than by name, since a positional-only
+            # parameter can share its name with a key in **kwargs
+            source = 'args[%d]' % positions[k]
+        else:
+            consts['k%d' % i] = k
+            source = 'kwargs[k%d]' % i
+        consts['n%d' % i] = k
+        types['t%d' % i] = k
+        lines.append('    v = %s' % source)
+        lines.append('    if not isinstance(v, t%d): _fail(n%d, t%d, v)' % (i, i, i))
+    if not lines:
+        return ()
+    source = '\n'.join(['def check(args, kwargs):'] + lines)
+    return (builtins.compile(source, '<veripy>', 'exec'), consts, types)
+
+
+def _build_checker(plan, argtypes):
+    """
+    Returns the checker function for the given plan
+    """
+    if not plan:
+        return _check_nothing
+    code, consts, types = plan
+    namespace = dict(consts)
+    namespace['_fail'] = _fail
+    for name, k in types.items():
+        namespace[name] = argtypes[k]
+    exec(code, namespace)
+    return namespace['check']
+
+
+def _checker(f, signature, argtypes, shape, args, kwargs):
+    """
+    Returns the checker for calls to f with the given shape, using the plan from the plan
+    cache if there is one
+    
+    signature is a function that returns the signature of f
+    """
+    cache = plan_cache
+    if cache is None:
+        return _build_checker(_plan_checker(signature(), argtypes, args, kwargs), argtypes)
+    key = cache.key(f, argtypes, signature)
+    plan = cache.get(key, shape)
+    if plan is None:
+        plan = _plan_checker(signature(), argtypes, args, kwargs)
+        cache.put(key, shape, plan)
+    return _build_checker(plan, argtypes)
+
+
+def _annotations(f):
+    """
+    Returns the annotations for the parameters and return value of f
+    
+    The annotations of plain functions are read directly, otherwise they are taken from the
+    signature, which follows __wrapped__ and __signature__
+    """
+    if type(f) is FunctionType and not hasattr(f, '__wrapped__') and \
+       not hasattr(f, '__signature__'):
+        return f.__annotations__
+    s = inspect.signature(f)
+    annotations = dict((k, p.annotation) for k, p in s.parameters.items()
+                                         if p.annotation is not P.empty)
+    if s.return_annotation is not S.empty:
+        annotations['return'] = s.return_annotation
+    return annotations
+
+
+def _contract(f):
+    """
+    Returns the parameter types of f, as a map of name => type, and its return type, or None
+    if it has no return type
+    """
+    argtypes = {}
+    returntype = None
+    for k, a in _annotations(f).items():
+        # We allow None instead of NoneType
+        if a is None:
+            a = type(None)
+        # Annotations that are not types are not verified
+        if not isinstance(a, type):
+            continue
+        if k == 'return':
+            returntype = a
+        else:
+            argtypes[k] = a
+    return argtypes, returntype
+
+
+class _Registration:
+    """
+    Record of a function decorated with verify, so that verification can be switched on and
+    off for all functions in bulk
+    
+    The wrapper is only referenced weakly, since it refers to the function, which is the key
+    for the registration
+    """
+    __slots__ = ('sample', 'contract', '_wrapper')
+    
+    def __init__(self, sample, wrapper, contract = None):
+        self.sample = sample
+        self.contract = contract
+        self.wrapper = wrapper
+        
+    @property
+    def wrapper(self):
+        return None if self._wrapper is None else self._wrapper()
+    
+    @wrapper.setter
+    def wrapper(self, wrapper):
+        self._wrapper = None if wrapper is None else weakref.ref(wrapper)
+
+
+# Registrations for all the functions decorated with verify that can be rebound, keyed by
+# the original function
+# Decorating the same function again replaces its registration, and registrations go away
+# with their functions
+_registry = weakref.WeakKeyDictionary()
+
+
+def _register(f, sample, wrapper, contract = None):
+    """
+    Registers the function f, decorated with verify, unless it cannot be rebound
+    """
+    qualname = getattr(f, '__qualname__', None)
+    # Functions defined inside other functions cannot be rebound, and neither can callables
+    # without a qualified name, e.g. partials
+    if qualname is None or '<locals>' in qualname:
+        return
+    try:
+        _registry[f] = _Registration(sample, wrapper, contract)
+    except TypeError:
+        # Callables that cannot be weakly referenced are not registered
+        pass
+
+
+def _rebind(old, new):
+    """
+    Replaces the function old with new in the module or class that it belongs to, according
+    to its qualified name, and returns True if successful
+    """
+    path = old.__qualname__.split('.')
+    owner = sys.modules.get(old.__module__)
+    for name in path[:-1]:
+        owner = getattr(owner, name, None)
+    if owner is None:
+        return False
+    current = vars(owner).get(path[-1])
+    if current is old:
+        setattr(owner, path[-1], new)
+    elif isinstance(current, (staticmethod, classmethod)) and current.__func__ is old:
+        setattr(owner, path[-1], type(current)(new))
+    elif isinstance(current, property) and old in (current.fget, current.fset, current.fdel):
+        accessors = (new if a is old else a for a in (current.fget, current.fset, current.fdel))
+        setattr(owner, path[-1], type(current)(*accessors, current.__doc__))
+    else:
+        return False
+    return True
+
+
+def enable_all():
+    """
+    Swaps verifying wrappers in for all the functions decorated with verify that were stripped,
+    and stops verify from stripping functions that are decorated later
+    
+    Returns the number of functions that were swapped
+    """
+    global strip
+    strip = False
+    swapped = 0
+    for f, r in list(_registry.items()):
+        wrapper = r.wrapper
+        if wrapper is None:
+            wrapper = r.wrapper = _verify(f, r.sample, r.contract)
+        swapped += _rebind(f, wrapper)
+    return swapped
+
+
+def disable_all():
+    """
+    Swaps the original functions back in for all the functions decorated with verify, and
+    makes verify strip functions that are decorated later
+    
+    Returns the number of functions that were swapped
+    """
+    global strip
+    strip = True
+    swapped = 0
+    for f, r in list(_registry.items()):
+        wrapper = r.wrapper
+        if wrapper is not None:
+            swapped += _rebind(wrapper, f)
+    return swapped
 
-def verify(f):
+
+def verify(f = None, *, sample = None):
     """
     Decorator that enforces contracts defined in function annotations
     
@@ -24,44 +329,249 @@ def verify(f):
     Similarly, if no return annotation is given, or the annotation is not a type, no verification
     is performed on the return value
     The only non-type annotation that is interpreted is None, which is taken to mean NoneType  
+    
+    If a sampling policy is given, e.g. @verify(sample = EveryN(100)), only the calls chosen
+    by the policy are verified, otherwise the global policy is used if there is one
+    
+    The annotations are not analysed until the first call that is verified, and the checkers
+    compiled for each call shape can be cached between runs by setting plan_cache
+    
+    If strip is True, f is returned unchanged
+    Functions defined at module or class level can be switched between the verifying wrapper
+    and the original function in bulk using enable_all and disable_all
     """
-    # Get the valid parameter and returns annotations
-    s = inspect.signature(f)
-    # Parameter types are stored as a map of name => type
-    argtypes = {}
-    for k, a in ((k, p.annotation) for k, p in s.parameters.items() if p.annotation is not P.empty):
-        if a is None:
-            a = type(None)
-        if not isinstance(a, type):
+    if f is None:
+        return functools.partial(verify, sample = sample)
+    wrapper = None if strip else _verify(f, sample)
+    _register(f, sample, wrapper)
+    return f if wrapper is None else wrapper
+
+
+def verify_class(cls = None, *, sample = None):
+    """
+    Class decorator that applies verify to all the methods of a class in one pass, including
+    static methods, class methods and the accessors of properties
+    
+    The first parameter of methods and class methods, i.e. self or cls, is not verified, and
+    methods without any annotations are left unchanged
+    Methods with identical signatures share the analysis of their contract and their compiled
+    checkers
+    Nothing is stored on instances, so classes with __slots__ are supported
+    """
+    if cls is None:
+        return functools.partial(verify_class, sample = sample)
+    # Contracts shared by methods with identical signatures, keyed by the layout of the
+    # parameters and the ids of the types
+    contracts = {}
+    def wrap(f, method):
+        if not callable(f):
+            return f
+        argtypes, returntype = _contract(f)
+        plain = type(f) is FunctionType and not hasattr(f, '__wrapped__')
+        if method:
+            argtypes.pop(_receiver(f, plain), None)
+        if not argtypes and returntype is None:
+            return f
+        contract = (argtypes, returntype, {})
+        if plain:
+            key = (_layout(f), tuple((k, id(t)) for k, t in sorted(argtypes.items())),
+                   id(returntype))
+            contract = contracts.setdefault(key, contract)
+        wrapper = None if strip else _verify(f, sample, contract)
+        _register(f, sample, wrapper, contract)
+        return f if wrapper is None else wrapper
+    for name, value in list(vars(cls).items()):
+        if isinstance(value, FunctionType):
+            new = wrap(value, True)
+            changed = new is not value
+        elif isinstance(value, (staticmethod, classmethod)):
+            # __new__ is a static method, but its first parameter is still the class
+            method = isinstance(value, classmethod) or name == '__new__'
+            func = wrap(value.__func__, method)
+            changed = func is not value.__func__
+            new = type(value)(func)
+        elif isinstance(value, property):
+            accessors = (value.fget, value.fset, value.fdel)
+            wrapped = tuple(a if a is None else wrap(a, True) for a in accessors)
+            changed = wrapped != accessors
+            new = type(value)(*wrapped, value.__doc__)
+        else:
             continue
-        argtypes[k] = a
-    # See if there is a return type
-    returntype = None
-    if s.return_annotation is not S.empty:
-        returntype = s.return_annotation
-        if returntype is None:
-            returntype = type(None)
-        if not isinstance(returntype, type):
-            returntype = None
-    
-    # Return a function that verifies the types before and after the call
-    @functools.wraps(f)
-    def wrapper(*args, **kwargs):
-        # If verification is off, do nothing
-        if not enabled: return f(*args, **kwargs)
-        # Otherwise, we need to check our constraints
-        # First, bind the given args to the args of f
-        bound = s.bind(*args, **kwargs)
-        # Verify that the given args match the specified types
-        for k, v in bound.arguments.items():
-            if k in argtypes and not isinstance(v, argtypes[k]):
-                raise TypeError("Incorrect type for %s - "
-                                "expected %s ; got: %s" % (k, repr(argtypes[k]), repr(type(v))))
-        # Check the return value against the return type
-        result = f(*args, **kwargs)
-        if returntype is None or isinstance(result, returntype):
-            return result
+        if changed:
+            setattr(cls, name, new)
+    return cls
+
+
+def _receiver(f, plain):
+    """
+    Returns the name of the first positional parameter of f, or None if it has none
+    """
+    if plain:
+        code = f.__code__
+        return code.co_varnames[0] if code.co_argcount else None
+    for k, p in inspect.signature(f).parameters.items():
+        if p.kind in (P.POSITIONAL_ONLY, P.POSITIONAL_OR_KEYWORD):
+            return k
+        break
+    return None
+
+
+def _layout(f):
+    """
+    Returns a key describing the names and kinds of the parameters of the plain function f
+    and which of them have defaults, which decides how the arguments of calls are bound
+    """
+    code = f.__code__
+    varflags = code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+    nparams = code.co_argcount + code.co_kwonlyargcount + bin(varflags).count('1')
+    return (code.co_argcount, code.co_posonlyargcount, code.co_kwonlyargcount, varflags,
+            code.co_varnames[:nparams], len(f.__defaults__ or ()),
+            tuple(sorted(f.__kwdefaults__ or ())))
+
+
+def _verify(f, sample, contract = None):
+    """
+    Returns a wrapper for f that verifies the contract defined by its annotations
+    
+    If contract is given, it is a tuple of the parameter types, the return type and the
+    dict of compiled checkers to use instead of analysing the annotations of f
+    """
+    # The contract is analysed by resolve when the first call is verified, so that decorating
+    # a function is cheap
+    argtypes = returntype = wrapresult = itemtype = None
+    call = f
+    # The signature is only needed to compile checkers and wrap arguments
+    sig = None
+    def signature():
+        nonlocal sig
+        if sig is None:
+            sig = inspect.signature(f)
+        return sig
+    
+    def resolve():
+        nonlocal argtypes, returntype, wrapresult, itemtype, call
+        argtypes, returntype = _contract(f) if contract is None else contract[:2]
+        # Types such as Iterable[int] can only check iterators lazily, by wrapping them
+        lazytypes = dict((k, t) for k, t in argtypes.items() if _is_lazy(t))
+        wrapresult = returntype.wrap if _is_lazy(returntype) else None
+        if lazytypes:
+            def call(*args, **kwargs):
+                bound = signature().bind(*args, **kwargs)
+                for k, t in lazytypes.items():
+                    if k in bound.arguments:
+                        bound.arguments[k] = t.wrap(bound.arguments[k])
+                return f(*bound.args, **bound.kwargs)
+        # For generators, an iterable return type, e.g. Iterable[int], describes the yielded
+        # values, which are checked as they are yielded
+        # Any other return type is checked against the generator itself
+        if isinstance(returntype, IterableMeta) and returntype.__elementtype__ is not None and \
+           returntype.__container__ is collections.abc.Iterable:
+            itemtype = returntype.__elementtype__
+    
+    # Argument checkers are compiled on demand for each call shape that we see
+    # The key is the number of positional arguments, plus the keyword argument names if
+    # there are any
+    checkers = {} if contract is None else contract[2]
+    # A given contract is already analysed, and its checkers may be shared with other
+    # functions, so check_args may never be called for this one
+    if contract is not None:
+        resolve()
+    # The samplers for this function, for each policy that has been used with it
+    samplers = SamplerTable()
+    
+    def check_args(args, kwargs):
+        # This is only called when there is no checker for the call shape yet, so it is
+        # always called for the first call that is verified
+        if argtypes is None:
+            resolve()
+        if len(checkers) >= MAX_SHAPES:
+            return _check_bound(signature(), argtypes, args, kwargs)
+        shape = (len(args), tuple(kwargs)) if kwargs else len(args)
+        checker = _checker(f, signature, argtypes, shape, args, kwargs)
+        checkers[shape] = checker
+        checker(args, kwargs)
+    
+    def check_call(args, kwargs):
+        # Returns False if the call should not be verified, otherwise checks the arguments
+        if not enabled: return False
+        p = sample or policy
+        if p is not None and not samplers[p](args, kwargs): return False
+        try:
+            checker = checkers[(len(args), tuple(kwargs)) if kwargs else len(args)]
+        except KeyError:
+            check_args(args, kwargs)
         else:
-            raise TypeError("Incorrect return type - "
-                            "expected %s ; got: %s" % (repr(returntype), repr(type(result))))
+            checker(args, kwargs)
+        return True
+    
+    def check_result(result):
+        if returntype is None or isinstance(result, returntype):
+            return result if wrapresult is None else wrapresult(result)
+        _fail_return(returntype, result)
+    
+    def check_item(item):
+        if itemtype is not None and not isinstance(item, itemtype):
+            raise TypeError("Incorrect type for yielded value - "
+                            "expected %s ; got: %s" % (repr(itemtype), repr(type(item))))
+    
+    # If instrumentation is enabled, the checks are swapped for instrumented versions
+    # Otherwise, there is no trace of it in the wrapper
+    stats = None
+    if instrumentation.enabled:
+        stats = instrumentation.stats_for(f)
+        check_call = instrumentation.time_call_check(check_call, stats)
+        check_result = instrumentation.time_check(check_result, stats)
+        check_item = instrumentation.time_check(check_item, stats)
+    
+    # Generator, coroutine and asynchronous generator functions get wrappers that check the
+    # yielded values or the awaited result
+    # call is only decided by resolve, so they are given a function that looks it up when
+    # it is called
+    def late_call(*args, **kwargs):
+        return call(*args, **kwargs)
+    if inspect.iscoroutinefunction(f):
+        wrapper = coroutine_wrapper(f, late_call, check_call, check_result)
+    elif inspect.isasyncgenfunction(f):
+        def check_generator(agen):
+            if itemtype is None:
+                return check_result(agen)
+            return checked_async_generator(agen, check_item)
+        wrapper = async_generator_wrapper(f, late_call, check_call, check_generator)
+    elif inspect.isgeneratorfunction(f):
+        def check_generator(gen):
+            if itemtype is None:
+                return check_result(gen)
+            return checked_generator(gen, check_item)
+        wrapper = generator_wrapper(f, late_call, check_call, check_generator)
+    elif stats is not None:
+        def wrapper(*args, **kwargs):
+            if not check_call(args, kwargs): return f(*args, **kwargs)
+            return check_result(call(*args, **kwargs))
+    else:
+        # Return a function that verifies the types before and after the call
+        # The checks are inlined rather than using check_call and check_result, since this
+        # is the hot path
+        def wrapper(*args, **kwargs):
+            # If verification is off, do nothing
+            if not enabled: return f(*args, **kwargs)
+            # If there is a sampling policy, it decides whether to verify this call
+            p = sample or policy
+            if p is not None and not samplers[p](args, kwargs): return f(*args, **kwargs)
+            # Otherwise, we need to check our constraints
+            # First, verify that the given args match the specified types using the checker
+            # for this call shape
+            try:
+                checker = checkers[(len(args), tuple(kwargs)) if kwargs else len(args)]
+            except KeyError:
+                check_args(args, kwargs)
+            else:
+                checker(args, kwargs)
+            # Check the return value against the return type
+            result = call(*args, **kwargs)
+            if returntype is None or isinstance(result, returntype):
+                return result if wrapresult is None else wrapresult(result)
+            else:
+                _fail_return(returntype, result)
+    wrapper = functools.wraps(f)(wrapper)
+    wrapper.__samplers__ = samplers
     return wrapper
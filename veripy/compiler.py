@@ -0,0 +1,192 @@
+"""
+This module provides a compiler that turns a (possibly nested) veripy type into a single
+generated Python function that checks whether a value is an instance of the type
+
+The generated function inlines the checks for each level of the type, so checking a value
+does not go through isinstance, the metaclasses, generators or exception handling
+Where a check cannot be inlined, e.g. a union of records, the member is compiled into its
+own function which is called directly
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import collections.abc, operator, weakref
+
+from .types import TypeMeta, UnionMeta, IntersectionMeta, is_nominal
+from .types.structural import TupleMeta, RecordMeta, HasAttrsMeta, IterableMeta
+from .types.comparison import ComparisonMeta, IntervalsMeta, SatisfiesMeta
+
+
+# The source for each comparison operator
+_OPERATORS = {
+    operator.eq : '==', operator.ne : '!=',
+    operator.ge : '>=', operator.gt : '>',
+    operator.le : '<=', operator.lt : '<',
+}
+
+
+# Compiled checkers for each type
+# They are not stored on veripy types, since parameterising a type copies its attributes
+_compiled = weakref.WeakKeyDictionary()
+
+
+def compile(t):
+    """
+    Returns a function that takes a single value and returns True if it is an instance of t
+    
+    Checkers are cached, so compiling the same type again returns the same function
+    """
+    if t is None:
+        t = type(None)
+    if not isinstance(t, type):
+        raise TypeError('Can only compile types')
+    checker = _compiled.get(t)
+    if checker is None:
+        checker = _compiled[t] = _Compiler(t).compile()
+    return checker
+
+
+class _Compiler:
+    """
+    Generates the source for the checker for a type
+    """
+    
+    def __init__(self, t):
+        self.t = t
+        self.namespace = { '_missing' : object(), '_Mapping' : collections.abc.Mapping }
+        self.lines = []
+        self.nvars = 0
+        
+    def compile(self):
+        self.stmts(self.t, 'v', 1)
+        source = '\n'.join(['def check(v):'] + self.lines + ['    return True'])
+        exec(source, self.namespace)
+        checker = self.namespace['check']
+        checker.__source__ = source
+        return checker
+    
+    def const(self, value):
+        """
+        Adds a constant to the namespace and returns its name
+        """
+        name = '_c%d' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+    
+    def var(self):
+        """
+        Returns the name of a new local variable
+        """
+        self.nvars += 1
+        return 'v%d' % self.nvars
+    
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+        
+    def is_instance(self, t, var):
+        """
+        Returns an expression that is True if var is an instance of the plain class t
+        """
+        if t is object:
+            return 'True'
+        if t is type(None):
+            return '%s is None' % var
+        # Checking the exact type first avoids the slower isinstance in the common case
+        return '(type(%s) is %s or isinstance(%s, %s))' % (var, self.const(t), var, self.const(t))
+        
+    def expr(self, t, var):
+        """
+        Returns an expression that is True if var is an instance of t
+        """
+        if not isinstance(t, TypeMeta):
+            if is_nominal(t):
+                return self.is_instance(t, var)
+            return 'isinstance(%s, %s)' % (var, self.const(t))
+        if isinstance(t, ComparisonMeta) and t.__hasvalue__ and t.__operator__ in _OPERATORS:
+            return '(%s %s %s)' % (var, _OPERATORS[t.__operator__], self.const(t.__value__))
+        if isinstance(t, IntervalsMeta) and t.__intervals__ is not None and \
+           len(t.__intervals__) == 1:
+            i = t.__intervals__[0]
+            bounds = []
+            if i.lo is not None:
+                bounds.append('%s %s %s' % (var, '>=' if i.lo_closed else '>', self.const(i.lo)))
+            if i.hi is not None:
+                bounds.append('%s %s %s' % (var, '<=' if i.hi_closed else '<', self.const(i.hi)))
+            return '(%s)' % ' and '.join(bounds or ['True'])
+        if isinstance(t, SatisfiesMeta) and t.__predicate__:
+            return '%s(%s)' % (self.const(t.__check__), var)
+        if isinstance(t, UnionMeta) and t.__uniontypes__:
+            members = t.__nominaltypes__ + t.__valuetypes__
+            return '(%s)' % ' or '.join(self.expr(m, var) for m in members)
+        if isinstance(t, IntersectionMeta) and t.__intersecttypes__:
+            members = t.__nominaltypes__ + t.__valuetypes__
+            return '(%s)' % ' and '.join(self.expr(m, var) for m in members)
+        if isinstance(t, (TupleMeta, HasAttrsMeta)) or _inline_record(t) or _inline_list(t):
+            # These need statements, so are compiled into their own function
+            return '%s(%s)' % (self.const(compile(t)), var)
+        if is_nominal(t):
+            return self.is_instance(t, var)
+        # Anything else uses the instance check of the type directly
+        return '%s(%s)' % (self.const(t.__instancecheck__), var)
+    
+    def stmts(self, t, var, indent):
+        """
+        Emits statements that return False if var is not an instance of t
+        """
+        if isinstance(t, IntersectionMeta) and t.__intersecttypes__:
+            # The members are checked in the same order as the instance check
+            for m in t.__nominaltypes__ + t.__valuetypes__:
+                self.stmts(m, var, indent)
+        elif isinstance(t, TupleMeta) and t.__tupletypes__:
+            self.emit(indent, 'if not %s: return False' % self.is_instance(tuple, var))
+            n = len(t.__tupletypes__)
+            self.emit(indent, 'if len(%s) %s %d: return False' % (var, '!=' if t.__strict__ else '<', n))
+            for i, et in enumerate(t.__tupletypes__):
+                v = self.var()
+                self.emit(indent, '%s = %s[%d]' % (v, var, i))
+                self.stmts(et, v, indent)
+        elif _inline_record(t):
+            # Plain dicts are checked inline, other mappings use the full instance check
+            n = len(t.__recordtypes__)
+            self.emit(indent, 'if type(%s) is dict:' % var)
+            self.emit(indent + 1, 'if len(%s) %s %d: return False' % (var, '!=' if t.__strict__ else '<', n))
+            for k, kt in t.__recordtypes__.items():
+                v = self.var()
+                self.emit(indent + 1, '%s = %s.get(%s, _missing)' % (v, var, self.const(k)))
+                self.emit(indent + 1, 'if %s is _missing: return False' % v)
+                self.stmts(kt, v, indent + 1)
+            self.emit(indent, 'elif not %s(%s): return False' % (self.const(t.__instancecheck__), var))
+        elif isinstance(t, HasAttrsMeta) and t.__attrtypes__:
+            for k, at in t.__attrtypes__.items():
+                v = self.var()
+                self.emit(indent, '%s = getattr(%s, %s, _missing)' % (v, var, self.const(k)))
+                self.emit(indent, 'if %s is _missing: return False' % v)
+                self.stmts(at, v, indent)
+        elif _inline_list(t):
+            self.emit(indent, 'if not %s: return False' % self.is_instance(list, var))
+            v = self.var()
+            self.emit(indent, 'for %s in %s:' % (v, var))
+            self.stmts(t.__elementtype__, v, indent + 1)
+        else:
+            self.emit(indent, 'if not %s: return False' % self.expr(t, var))
+
+
+def _inline_record(t):
+    """
+    Returns True if t is a record type whose values are checked inline
+    
+    Lazy records only check their keys, so are left to the instance check
+    """
+    return isinstance(t, RecordMeta) and t.__recordtypes__ and not t.__lazy__
+
+
+def _inline_list(t):
+    """
+    Returns True if t is a list type whose elements are checked by an inline loop
+    
+    Lists of nominal types are left to the instance check, which only checks each distinct
+    type of element once
+    """
+    return isinstance(t, IterableMeta) and t.__container__ is list and \
+           t.__elementtype__ is not None and not is_nominal(t.__elementtype__)
+
@@ -0,0 +1,98 @@
+"""
+This module provides the wrappers used by verify for generator functions, coroutine functions
+and asynchronous generator functions
+
+The arguments are checked when the function is called
+Generators and asynchronous generators are then delegated to by native generators that check
+each yielded value, and the wrapper for coroutine functions is a native coroutine function that
+checks the awaited result, so they need no extra tasks or threads
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+
+def generator_wrapper(f, call, check_call, check_result):
+    """
+    Returns a function that checks the arguments for each call to the generator function f
+    using check_call, and returns the generator returned by check_result
+    
+    The arguments are checked when f is called, as they would be for a plain function, rather
+    than when the generator is first advanced
+    call is the function used to call f once the arguments have been checked
+    """
+    def wrapper(*args, **kwargs):
+        if not check_call(args, kwargs):
+            return f(*args, **kwargs)
+        return check_result(call(*args, **kwargs))
+    return wrapper
+
+
+def checked_generator(gen, check_item):
+    """
+    Delegates to the generator gen in the same way as yield from, checking each yielded value
+    using check_item
+    """
+    sent = None
+    thrown = None
+    while True:
+        try:
+            item = gen.send(sent) if thrown is None else gen.throw(thrown)
+        except StopIteration as e:
+            return e.value
+        check_item(item)
+        try:
+            sent = yield item
+            thrown = None
+        except GeneratorExit:
+            gen.close()
+            raise
+        except BaseException as e:
+            thrown = e
+
+
+def coroutine_wrapper(f, call, check_call, check_result):
+    """
+    Returns a coroutine function that checks the arguments for each call to the coroutine
+    function f using check_call, and checks the awaited result using check_result
+    """
+    async def wrapper(*args, **kwargs):
+        if not check_call(args, kwargs):
+            return await f(*args, **kwargs)
+        return check_result(await call(*args, **kwargs))
+    return wrapper
+
+
+def async_generator_wrapper(f, call, check_call, check_result):
+    """
+    Returns a function that checks the arguments for each call to the asynchronous generator
+    function f using check_call, and returns the asynchronous generator returned by
+    check_result
+    """
+    # Calling an asynchronous generator function runs none of its code, so this is the same as
+    # for generator functions
+    return generator_wrapper(f, call, check_call, check_result)
+
+
+async def checked_async_generator(agen, check_item):
+    """
+    Delegates to the asynchronous generator agen, checking each yielded value using check_item
+    """
+    sent = None
+    thrown = None
+    while True:
+        try:
+            if thrown is None:
+                item = await agen.asend(sent)
+            else:
+                item = await agen.athrow(thrown)
+        except StopAsyncIteration:
+            return
+        check_item(item)
+        try:
+            sent = yield item
+            thrown = None
+        except GeneratorExit:
+            await agen.aclose()
+            raise
+        except BaseException as e:
+            thrown = e
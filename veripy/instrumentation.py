@@ -0,0 +1,242 @@
+"""
+This module provides opt-in instrumentation that records how much work verification does
+
+For each function decorated with verify, the number of calls, the number of calls that were
+verified, the number of failed checks and the cumulative time spent checking are recorded
+For each veripy type, the number of instance checks and the cumulative time spent in them
+are recorded
+The time for a type includes the time for any types nested inside it
+
+Instrumentation works by swapping instrumented wrappers and instance checks in for the plain
+ones, so it costs nothing while it is disabled
+Only functions that can be rebound (see veripy.enable_all) are swapped when instrumentation
+is enabled or disabled - other functions are instrumented if they are decorated while
+instrumentation is enabled
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import atexit, copy, time, weakref
+
+from .types import TypeMeta
+
+
+# Indicates whether instrumentation is enabled - use enable and disable to change it
+enabled = False
+
+# The function called with the function and type statistics when they are flushed
+_sink = None
+
+# The clock used for timing checks
+_clock = time.perf_counter
+
+
+class FunctionStats:
+    """
+    Statistics for a function decorated with verify
+    """
+    __slots__ = ('calls', 'checks', 'failures', 'check_time')
+    
+    def __init__(self):
+        self.calls = 0
+        self.checks = 0
+        self.failures = 0
+        self.check_time = 0.0
+        
+    def __repr__(self):
+        return 'FunctionStats(calls = %d, checks = %d, failures = %d, check_time = %f)' % \
+                   (self.calls, self.checks, self.failures, self.check_time)
+
+
+class TypeStats:
+    """
+    Statistics for the instance checks of a veripy type
+    """
+    __slots__ = ('checks', 'time')
+    
+    def __init__(self):
+        self.checks = 0
+        self.time = 0.0
+        
+    def __repr__(self):
+        return 'TypeStats(checks = %d, time = %f)' % (self.checks, self.time)
+
+
+# Statistics for each function, keyed by the function that was decorated
+function_stats = {}
+
+# Statistics for each type
+type_stats = weakref.WeakKeyDictionary()
+
+# The original instance checks of the metaclasses that have been instrumented
+_instancechecks = {}
+
+
+def stats_for(f):
+    """
+    Returns the statistics for the function f, creating them if they do not exist
+    """
+    try:
+        return function_stats[f]
+    except KeyError:
+        return function_stats.setdefault(f, FunctionStats())
+
+
+def time_call_check(check_call, stats):
+    """
+    Returns an instrumented version of check_call, which checks the arguments for a call and
+    returns False if the call is not being verified
+    """
+    def check(args, kwargs):
+        stats.calls += 1
+        start = _clock()
+        try:
+            checked = check_call(args, kwargs)
+        except TypeError:
+            # A call that fails was being verified
+            stats.checks += 1
+            stats.failures += 1
+            raise
+        finally:
+            stats.check_time += _clock() - start
+        stats.checks += checked
+        return checked
+    return check
+
+
+def time_check(check_value, stats):
+    """
+    Returns an instrumented version of check_value, which checks a result or yielded value
+    """
+    def check(value):
+        start = _clock()
+        try:
+            return check_value(value)
+        except TypeError:
+            stats.failures += 1
+            raise
+        finally:
+            stats.check_time += _clock() - start
+    return check
+
+
+def _record(cls, elapsed):
+    try:
+        stats = type_stats.get(cls)
+        if stats is None:
+            stats = type_stats[cls] = TypeStats()
+    except TypeError:
+        # Types with unhashable parameters are not recorded
+        return
+    stats.checks += 1
+    stats.time += elapsed
+
+
+def _timed_instancecheck(instancecheck):
+    """
+    Returns an instrumented version of the instance check for a metaclass
+    """
+    def __instancecheck__(cls, instance):
+        start = _clock()
+        try:
+            return instancecheck(cls, instance)
+        finally:
+            _record(cls, _clock() - start)
+    __instancecheck__.__wrapped__ = instancecheck
+    return __instancecheck__
+
+
+def _metaclasses(meta = TypeMeta):
+    """
+    Yields meta and all of its subclasses
+    """
+    yield meta
+    for sub in type.__subclasses__(meta):
+        yield from _metaclasses(sub)
+
+
+def _instrument_types():
+    for meta in _metaclasses():
+        if meta not in _instancechecks and '__instancecheck__' in meta.__dict__:
+            _instancechecks[meta] = meta.__instancecheck__
+            meta.__instancecheck__ = _timed_instancecheck(meta.__instancecheck__)
+
+
+def _restore_types():
+    for meta, instancecheck in _instancechecks.items():
+        meta.__instancecheck__ = instancecheck
+    _instancechecks.clear()
+
+
+def _swap_functions():
+    """
+    Swaps new wrappers in for all the rebindable functions decorated with verify
+    
+    The wrappers are instrumented if instrumentation is enabled
+    """
+    from . import _registry, _rebind, _verify
+    for f, r in list(_registry.items()):
+        old = r.wrapper
+        if old is not None:
+            wrapper = _verify(f, r.sample, r.contract)
+            if _rebind(old, wrapper):
+                r.wrapper = wrapper
+
+
+def enable(sink = None):
+    """
+    Enables instrumentation, optionally setting the sink that the statistics are sent to
+    by flush
+    
+    The sink is also called when the interpreter exits
+    """
+    global enabled, _sink
+    if sink is not None:
+        _sink = sink
+    if enabled:
+        return
+    enabled = True
+    _instrument_types()
+    _swap_functions()
+
+
+def disable():
+    """
+    Disables instrumentation, swapping the plain wrappers and instance checks back in
+    
+    The statistics recorded so far are kept until they are flushed or reset
+    """
+    global enabled
+    if not enabled:
+        return
+    enabled = False
+    _restore_types()
+    _swap_functions()
+
+
+def reset():
+    """
+    Discards all the statistics recorded so far
+    """
+    # The instrumented wrappers hold on to their statistics, so they are reset in place
+    for stats in function_stats.values():
+        stats.__init__()
+    type_stats.clear()
+
+
+def flush(keep = False):
+    """
+    Calls the sink, if there is one, with dicts containing copies of the function and type
+    statistics recorded so far, then resets the statistics unless keep is True
+    """
+    if _sink is not None:
+        _sink(dict((f, copy.copy(s)) for f, s in function_stats.items()),
+              dict((t, copy.copy(s)) for t, s in type_stats.items()))
+    if not keep:
+        reset()
+
+
+@atexit.register
+def _flush_at_exit():
+    if enabled:
+        flush()
@@ -0,0 +1,141 @@
+"""
+This module provides validation of large datasets against veripy types using a pool of
+processes, so that validation is not limited to a single core by the GIL
+
+Types are sent to the worker processes by pickling them, which works for any parameterised
+veripy type whose parameters can themselves be pickled
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import collections, itertools, json, mmap, os
+from concurrent.futures import ProcessPoolExecutor
+
+from .validation import validate, Error
+
+
+def _validate_rows(t, rows, max_errors):
+    """
+    Returns (index, errors) for each of the given rows that is not an instance of t, where
+    the index is relative to the start of rows
+    """
+    return [(i, validate(row, t, max_errors = max_errors))
+            for i, row in enumerate(rows) if not isinstance(row, t)]
+
+
+def _validate_lines(t, path, start, end, loads, max_errors):
+    """
+    Validates each line between the byte offsets start and end of the file at path, and
+    returns (number of lines, failures)
+    
+    Blank lines are skipped, and lines that cannot be decoded fail with a single error for
+    the missing value
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+            lines = m[start:end].splitlines()
+    failures = []
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            row = loads(line)
+        except ValueError:
+            failures.append((i, [Error((), t, None)]))
+            continue
+        if not isinstance(row, t):
+            failures.append((i, validate(row, t, max_errors = max_errors)))
+    return len(lines), failures
+
+
+def _ordered_results(executor, calls, max_pending):
+    """
+    Generator that submits each of the given (function, args) calls to the executor and yields
+    their results in the order the calls were given, with at most max_pending calls in flight
+    """
+    pending = collections.deque()
+    for fn, args in calls:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _run(calls, executor, max_workers):
+    """
+    Runs the given calls using the given executor, or a new process pool if there is none,
+    yielding the results in order
+    """
+    # Keep enough calls in flight for every worker to have one queued
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    if executor is not None:
+        yield from _ordered_results(executor, calls, max_pending)
+        return
+    with ProcessPoolExecutor(max_workers) as executor:
+        yield from _ordered_results(executor, calls, max_pending)
+
+
+def validate_many(rows, t, chunksize = 10000, max_workers = None, executor = None,
+                  max_errors = 100):
+    """
+    Generator that validates the given rows against the type t in a pool of processes, and
+    yields (index, errors) for each invalid row in input order, where errors is the list of
+    errors from veripy.validate
+    
+    The rows are sent to the workers in chunks of chunksize rows, and only a few chunks are
+    in flight at once, so rows can be an arbitrarily large iterable
+    If no executor is given, a ProcessPoolExecutor with max_workers processes is used
+    """
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+    rows = iter(rows)
+    chunks = iter(lambda: list(itertools.islice(rows, chunksize)), [])
+    calls = ((_validate_rows, (t, chunk, max_errors)) for chunk in chunks)
+    for n, failures in enumerate(_run(calls, executor, max_workers)):
+        for i, errors in failures:
+            yield n * chunksize + i, errors
+            
+            
+def _line_chunks(path, chunkbytes):
+    """
+    Returns the (start, end) byte offsets of chunks of the file at path of roughly chunkbytes
+    bytes, where each chunk ends at the end of a line
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunks = []
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+            start = 0
+            while start < size:
+                end = m.find(b'\n', min(start + chunkbytes, size) - 1)
+                end = size if end < 0 else end + 1
+                chunks.append((start, end))
+                start = end
+    return chunks
+
+
+def validate_file(path, t, chunkbytes = 1 << 22, loads = json.loads, max_workers = None,
+                  executor = None, max_errors = 100):
+    """
+    Generator that validates each line of the file at path, decoded using loads (by default,
+    as JSON), against the type t in a pool of processes, and yields (line index, errors) for
+    each invalid line in file order
+    
+    Blank lines are skipped, and a line that cannot be decoded is reported as invalid, with
+    a single error for the missing value
+    
+    The file is split into chunks of roughly chunkbytes bytes, and each worker reads its
+    chunk directly from a memory map of the file, so the records are never sent between
+    processes
+    loads must be picklable, e.g. a module-level function
+    """
+    calls = ((_validate_lines, (t, path, start, end, loads, max_errors))
+             for start, end in _line_chunks(path, chunkbytes))
+    offset = 0
+    for nlines, failures in _run(calls, executor, max_workers):
+        for i, errors in failures:
+            yield offset + i, errors
+        offset += nlines
@@ -0,0 +1,112 @@
+"""
+This module provides an on-disk cache of the plans used by verify to check the arguments
+of calls, so that a warm restart can skip the analysis of each function
+
+A plan is the compiled code of the checker for calls with a particular shape, plus the names
+that it refers to
+Plans are keyed by a hash of the code object of the function and the names of its annotated
+parameters, plus the names and kinds of its parameters if they are not described by its code,
+so a plan is discarded when the function changes
+The annotations themselves are not cached, so changes to the types are picked up
+
+The cache is stored using marshal, which is only compatible with the same version of Python
+Loading a cache executes the code that it contains, so it should only be stored somewhere
+that only trusted users can write to
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import atexit, hashlib, marshal, os
+from importlib.util import MAGIC_NUMBER
+from types import FunctionType
+
+
+# Identifies cache files that are compatible with this version of Python and veripy
+MAGIC = MAGIC_NUMBER + b'veripy-plans-1'
+
+
+class PlanCache:
+    """
+    Cache of checker plans that is loaded from the file at path when it is first used, and
+    saved back to it when the interpreter exits
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._plans = None
+        self._dirty = False
+        atexit.register(self.save)
+        
+    def key(self, f, argtypes, signature):
+        """
+        Returns the key for the plans for f with the given parameter types, or None if plans
+        for f cannot be cached
+        
+        signature is a function that returns the signature of f, which is used when the
+        parameters of f are not described by its code, e.g. for functions that wrap another
+        function and take *args and **kwargs
+        """
+        code = getattr(f, '__code__', None)
+        if code is None:
+            return None
+        digest = hashlib.sha1(marshal.dumps(code))
+        digest.update(repr(sorted(argtypes)).encode())
+        if type(f) is not FunctionType or hasattr(f, '__wrapped__') or \
+           hasattr(f, '__signature__'):
+            layout = [(p.name, int(p.kind)) for p in signature().parameters.values()]
+            digest.update(repr(layout).encode())
+        return digest.hexdigest()
+    
+    def _read(self):
+        """
+        Returns the plans stored in the file, or an empty dict if it does not exist or is not
+        compatible
+        """
+        try:
+            with open(self.path, 'rb') as fh:
+                if fh.read(len(MAGIC)) == MAGIC:
+                    plans = marshal.load(fh)
+                    if isinstance(plans, dict):
+                        return plans
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        return {}
+    
+    def get(self, key, shape):
+        """
+        Returns the plan for calls with the given shape for the function with the given key,
+        or None if there is none
+        """
+        if key is None:
+            return None
+        if self._plans is None:
+            self._plans = self._read()
+        return self._plans.get(key, {}).get(shape)
+    
+    def put(self, key, shape, plan):
+        """
+        Stores the plan for calls with the given shape for the function with the given key
+        """
+        if key is None:
+            return
+        if self._plans is None:
+            self._plans = self._read()
+        self._plans.setdefault(key, {})[shape] = plan
+        self._dirty = True
+        
+    def save(self):
+        """
+        Writes any new plans to the file, merging them with the plans that are already there
+        """
+        if not self._dirty:
+            return
+        plans = self._read()
+        for key, shapes in self._plans.items():
+            plans.setdefault(key, {}).update(shapes)
+        # Write to a temporary file first, so that the cache is never left half-written
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'wb') as fh:
+            fh.write(MAGIC)
+            marshal.dump(plans, fh)
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -0,0 +1,183 @@
+"""
+This module provides sampling policies, which allow verify to check only some of the calls
+to a function
+
+A policy can be given for a single function using verify(sample = policy), or for all functions
+that do not specify their own policy by setting veripy.policy
+
+Each decorated function gets its own sampler from the policy, which decides whether each call
+is checked and counts the calls that are checked and skipped
+The counts are not protected by a lock, so may be slightly out when there are many threads
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import itertools, time
+
+
+class Policy:
+    """
+    Base class for sampling policies
+    """
+    
+    def sampler(self):
+        """
+        Returns a new sampler for a single function
+        """
+        raise NotImplementedError
+    
+    
+class Sampler:
+    """
+    Base class for samplers
+    
+    Samplers are called with the positional and keyword arguments of a call, and return True if
+    the call should be checked
+    """
+    __slots__ = ('checked', 'skipped')
+    
+    def __init__(self):
+        self.checked = 0
+        self.skipped = 0
+    
+    def __call__(self, args, kwargs):
+        raise NotImplementedError
+    
+    
+class SamplerTable(dict):
+    """
+    Mapping of policy => sampler for a single function, where samplers are created on demand
+    """
+    
+    def __missing__(self, policy):
+        sampler = self[policy] = policy.sampler()
+        return sampler
+    
+    
+def counts(f):
+    """
+    Returns (checked, skipped) for a function decorated with verify, i.e. the number of calls
+    that have been checked and skipped by its samplers
+    """
+    samplers = getattr(f, '__samplers__', None)
+    if samplers is None:
+        raise TypeError('Function is not decorated with verify')
+    samplers = list(samplers.values())
+    return sum(s.checked for s in samplers), sum(s.skipped for s in samplers)
+
+
+class EveryN(Policy):
+    """
+    Policy that checks one in every n calls to each function, starting with the first
+    """
+    
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError('n must be at least 1')
+        self.n = n
+        
+    def sampler(self):
+        return EveryNSampler(self.n)
+    
+    
+class EveryNSampler(Sampler):
+    """
+    Sampler for the EveryN policy
+    """
+    __slots__ = ('n', 'calls')
+    
+    def __init__(self, n):
+        super().__init__()
+        self.n = n
+        self.calls = itertools.count()
+        
+    def __call__(self, args, kwargs):
+        if next(self.calls) % self.n:
+            self.skipped += 1
+            return False
+        self.checked += 1
+        return True
+    
+    
+class FirstK(Policy):
+    """
+    Policy that checks the first k calls to each function for each distinct combination of
+    argument types
+    
+    At most max_signatures combinations are remembered for each function - calls with any
+    other combination are always checked
+    """
+    
+    def __init__(self, k, max_signatures = 1024):
+        self.k = k
+        self.max_signatures = max_signatures
+        
+    def sampler(self):
+        return FirstKSampler(self.k, self.max_signatures)
+    
+    
+class FirstKSampler(Sampler):
+    """
+    Sampler for the FirstK policy
+    """
+    __slots__ = ('k', 'max_signatures', 'seen')
+    
+    def __init__(self, k, max_signatures):
+        super().__init__()
+        self.k = k
+        self.max_signatures = max_signatures
+        self.seen = {}
+        
+    def __call__(self, args, kwargs):
+        key = tuple(map(type, args))
+        if kwargs:
+            key = (key, tuple((k, type(v)) for k, v in kwargs.items()))
+        n = self.seen.get(key, 0)
+        if n >= self.k:
+            self.skipped += 1
+            return False
+        if n or len(self.seen) < self.max_signatures:
+            self.seen[key] = n + 1
+        self.checked += 1
+        return True
+    
+    
+class TokenBucket(Policy):
+    """
+    Policy that checks at most rate calls per second to each function, allowing bursts of up
+    to burst checked calls
+    """
+    
+    def __init__(self, rate, burst = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        
+    def sampler(self):
+        return TokenBucketSampler(self.rate, self.burst)
+    
+    
+class TokenBucketSampler(Sampler):
+    """
+    Sampler for the TokenBucket policy
+    """
+    __slots__ = ('rate', 'burst', 'tokens', 'last')
+    
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        
+    def __call__(self, args, kwargs):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            self.skipped += 1
+            return False
+        self.tokens -= 1
+        self.checked += 1
+        return True
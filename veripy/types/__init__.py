@@ -7,14 +7,579 @@ of as a type, such as dependent types and existential types
 @author: Matt Pryor <mkjpryor@gmail.com>
 """
 
+import abc, array, copyreg, sys, weakref
+
+
+# numpy is only imported the first time it is needed to vectorise a check, since importing
+# it is expensive - False means that it is not available
+_numpy_module = None
+
+
+def _numpy():
+    """
+    Returns the numpy module, importing it if necessary, or None if it is not available
+    """
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy_module = numpy
+    return _numpy_module or None
+
+
+class InternTable:
+    """
+    Table of parameterised types, keyed by the type being parameterised and its normalised
+    parameters, so that identical parameterisations return the identical class
+
+    Classes are held weakly, so they are discarded once they are no longer used elsewhere
+    If maxsize is given, no new classes are interned once the table holds that many classes
+    """
+    
+    def __init__(self, maxsize = None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._classes = weakref.WeakValueDictionary()
+        
+    def __len__(self):
+        return len(self._classes)
+    
+    def lookup(self, key, factory):
+        """
+        Returns the class interned for key, calling factory to create it if there is none
+        
+        If key is not hashable, factory is called and the result is not interned
+        """
+        try:
+            cls = self._classes.get(key)
+        except TypeError:
+            self.misses += 1
+            return factory()
+        if cls is not None:
+            self.hits += 1
+            return cls
+        self.misses += 1
+        cls = factory()
+        if self.maxsize is None or len(self._classes) < self.maxsize:
+            self._classes[key] = cls
+        return cls
+    
+    def clear(self):
+        """
+        Removes all interned classes from the table and resets the counters
+        """
+        self._classes.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# The table used to intern all parameterised types
+intern_table = InternTable()
+
+
+# The maximum number of concrete types for which each union or intersection caches the
+# result of an instance check
+INSTANCE_CACHE_SIZE = 256
+
+
+def is_nominal(t):
+    """
+    Returns True if isinstance(x, t) depends only on type(x), i.e. t does not inspect the value
+    """
+    instancecheck = type(t).__instancecheck__
+    if instancecheck is type.__instancecheck__ or instancecheck is abc.ABCMeta.__instancecheck__:
+        return True
+    return getattr(t, '__nominal__', False)
+
+
+# The maximum number of entries in each of the caches used for subtype checks
+SUBTYPE_CACHE_SIZE = 65536
+
+# Cached results of subtype checks, keyed by the ids of the types
+_subtypes = {}
+
+# Cached reductions of the types in unions and intersections, keyed by the ids of the types,
+# as the indexes of the types that are kept
+_reductions = {}
+
+# Weak references to the types whose ids appear in the caches, keyed by id, with the keys
+# that each of them appears in
+# The entries for a type are evicted when it is collected, so the caches never keep types
+# alive and an id is never reused while it is in the caches
+_watched = {}
+
+# The ABC cache token when the caches were last cleared
+_subtypes_token = None
+
+
+def _clear_subtype_caches():
+    _subtypes.clear()
+    _reductions.clear()
+    _watched.clear()
+
+
+def _check_subtype_caches():
+    """
+    Clears the subtype caches if the ABC cache token has changed, since registering a virtual
+    subclass can change the result of subtype checks
+    """
+    global _subtypes_token
+    token = abc.get_cache_token()
+    if token != _subtypes_token:
+        _clear_subtype_caches()
+        _subtypes_token = token
+
+
+def _watch(types, key):
+    """
+    Records that the given key of the subtype caches refers to the given types
+    """
+    for t in types:
+        try:
+            _watched[id(t)][1].append(key)
+        except KeyError:
+            _watched[id(t)] = (weakref.ref(t, lambda _, i = id(t): _evict(i)), [key])
+
+
+def _evict(i):
+    """
+    Evicts the entries for the type with the given id from the subtype caches
+    """
+    _, keys = _watched.pop(i, (None, ()))
+    for key in keys:
+        _subtypes.pop(key, None)
+        _reductions.pop(key, None)
+
+
+def is_subtype(t1, t2):
+    """
+    Returns issubclass(t1, t2), using a cache shared by all the veripy types
+    """
+    # Checks against plain classes only walk the MRO, so are not worth caching
+    if type(t2) is type:
+        return issubclass(t1, t2)
+    _check_subtype_caches()
+    key = (id(t1), id(t2))
+    result = _subtypes.get(key)
+    if result is None:
+        result = issubclass(t1, t2)
+        if len(_subtypes) >= SUBTYPE_CACHE_SIZE:
+            _clear_subtype_caches()
+        _subtypes[key] = result
+        _watch((t1, t2), key)
+    return result
+
+
+def _reduce_types(types, union):
+    """
+    Returns a tuple of the given types, in order, with duplicates and redundant types removed
+    
+    For a union, types that are subtypes of another type are redundant, and for an intersection,
+    types that are supertypes of another type are redundant
+    If two types are subtypes of each other, the first is kept
+    """
+    types = tuple(types)
+    _check_subtype_caches()
+    key = (union, ) + tuple(map(id, types))
+    kept = _reductions.get(key)
+    if kept is None:
+        reduced = _reduce(types, union)
+        if len(_reductions) >= SUBTYPE_CACHE_SIZE:
+            _clear_subtype_caches()
+        index = dict((id(t), i) for i, t in reversed(list(enumerate(types))))
+        kept = _reductions[key] = tuple(index[id(t)] for t in reduced)
+        _watch(set(types), key)
+    return tuple(map(types.__getitem__, kept))
+
+
+def _reduce(types, union):
+    """
+    Does the work for _reduce_types
+    
+    Plain classes are only subtypes of other plain classes that appear in their MRO, so those
+    checks take time proportional to the depth of the MRO rather than the number of types
+    """
+    members = []
+    seen = set()
+    for t in types:
+        if t not in seen:
+            seen.add(t)
+            members.append(t)
+    plain = set(t for t in members if type(t) is type)
+    others = [t for t in members if type(t) is not type]
+    subtypes = {}
+    if not union:
+        # Plain classes that appear in the MRO of another type are supertypes of that type
+        for u in members:
+            for t in plain.intersection(u.__mro__[1:]):
+                subtypes.setdefault(t, []).append(u)
+    index = dict((id(t), i) for i, t in enumerate(members))
+    def redundant(t, u):
+        # Returns True if t is redundant because of u
+        sub, sup = (t, u) if union else (u, t)
+        if not is_subtype(sub, sup):
+            return False
+        return not is_subtype(sup, sub) or index[id(u)] < index[id(t)]
+    def dominators(t):
+        # Returns the types that could make t redundant
+        if union:
+            # Only plain classes in the MRO of t can be plain supertypes of t
+            return list(plain.intersection(t.__mro__[1:])) + others
+        # Only plain classes can be subtypes of a plain class, and those have t in their MRO
+        return subtypes.get(t, []) + (others if type(t) is type else members)
+    kept = set(t for t in members
+                 if not any(u is not t and redundant(t, u) for u in dominators(t)))
+    # Subtyping between ABCs is not always transitive, so types that are only redundant
+    # because of types that were removed themselves are kept
+    reduced = [t for t in members
+                 if t in kept or not any(u in kept and redundant(t, u) for u in dominators(t))]
+    # The first of any types that are subtypes of each other is always kept
+    assert reduced, 'reduction removed all the types'
+    return tuple(reduced)
+
+
+# The cost used for types that do not declare one
+DEFAULT_COST = 2
+
+
+def cost(t):
+    """
+    Returns the relative cost of checking whether a value is an instance of t, which is used
+    to decide the order in which the members of an intersection are checked
+    
+    Nominal types cost 0, since their results are cached, comparisons cost 1, structural
+    types cost 2 or 3 and predicates cost 4, unless they declare their own cost using __cost__
+    """
+    if is_nominal(t):
+        return 0
+    return getattr(t, '__cost__', DEFAULT_COST)
+
+
+def _init_instance_cache(cls, types):
+    """
+    Splits the given types into nominal and value-dependent types and sets up the cache used
+    for the instance checks against the nominal types
+    """
+    cls.__nominaltypes__ = tuple(t for t in types if is_nominal(t))
+    cls.__valuetypes__ = tuple(t for t in types if not is_nominal(t))
+    cls.__nominal__ = not cls.__valuetypes__
+    cls.__instancecache__ = {}
+    # ABCs can gain virtual subclasses at any time, in which case the cache is invalidated
+    # when the ABC cache token changes
+    # This includes nested unions and intersections whose own caches depend on ABCs
+    if any(isinstance(t, abc.ABCMeta) or getattr(t, '__cachetoken__', None) is not None
+           for t in cls.__nominaltypes__):
+        cls.__cachetoken__ = abc.get_cache_token()
+    else:
+        cls.__cachetoken__ = None
+
+
+def _nominal_instancecheck(cls, instance, combine):
+    """
+    Returns the result of combine (i.e. any or all) over the instance checks for the nominal
+    types of cls, using the result cached for type(instance) if there is one
+    
+    isinstance also looks at instance.__class__, so the cache is not used for instances, such
+    as proxies, that override it
+    """
+    key = type(instance)
+    if instance.__class__ is not key:
+        return combine(isinstance(instance, t) for t in cls.__nominaltypes__)
+    cache = cls.__instancecache__
+    if cls.__cachetoken__ is not None and cls.__cachetoken__ != abc.get_cache_token():
+        cache.clear()
+        cls.__cachetoken__ = abc.get_cache_token()
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    result = combine(isinstance(instance, t) for t in cls.__nominaltypes__)
+    if len(cache) < INSTANCE_CACHE_SIZE:
+        cache[key] = result
+    return result
+
+
+def _in_order(types, given):
+    """
+    Returns a tuple of the given set of types, in the order that they appear in given
+    
+    Any types that do not appear in given come last
+    """
+    ordered = []
+    for t in given:
+        if t in types and t not in ordered:
+            ordered.append(t)
+    return tuple(ordered) + tuple(t for t in types if t not in ordered)
+
+
+def as_array(values):
+    """
+    Returns a numpy array that views the given values without copying them
+    
+    Returns None if numpy is not available, if values is not a numpy array, array.array or
+    memoryview, or if the values are Python objects rather than numbers
+    """
+    # A numpy array can only exist if numpy has already been imported
+    ndarray = getattr(sys.modules.get('numpy'), 'ndarray', None)
+    if ndarray is None or not isinstance(values, ndarray):
+        if not isinstance(values, (array.array, memoryview)):
+            return None
+        numpy = _numpy()
+        if numpy is None:
+            return None
+        values = numpy.asarray(values)
+    if values.dtype.kind == 'O':
+        return None
+    return values
+
+
+# The Python type of the values in numpy arrays of each dtype kind
+_KIND_TYPES = { 'b' : bool, 'i' : int, 'u' : int, 'f' : float, 'c' : complex, 'U' : str, 'S' : bytes }
+
+
+def check_many(t, values):
+    """
+    Returns a mask indicating which of the given values are instances of t
+    
+    If values can be viewed as a numpy array (see as_array), the mask is a new numpy array of
+    bools, otherwise it is a new list of bools
+    """
+    if isinstance(t, TypeMeta):
+        return t.check_many(values)
+    arr = as_array(values)
+    if arr is not None:
+        numpy = _numpy()
+        # For nominal types, the dtype of the array tells us the answer for every value
+        pytype = _KIND_TYPES.get(arr.dtype.kind)
+        if pytype is not None and is_nominal(t):
+            return numpy.full(len(arr), issubclass(pytype, t), dtype = bool)
+        # Check the elements as Python objects rather than numpy scalars
+        return numpy.fromiter((isinstance(v, t) for v in arr.tolist()), bool, len(arr))
+    return [isinstance(v, t) for v in values]
+
+
+def first_failure(t, values):
+    """
+    Returns the index of the first of the given values that is not an instance of t, or None
+    if all the values are instances of t
+    """
+    if as_array(values) is None:
+        for i, v in enumerate(values):
+            if not isinstance(v, t):
+                return i
+        return None
+    mask = check_many(t, values)
+    if not len(mask):
+        return None
+    # argmin gives the index of the first False, if there is one
+    i = int(_numpy().argmin(mask))
+    return None if mask[i] else i
+
+
+def _combine_masks(cls, values, union):
+    """
+    Checks the given values against each of the types in the union or intersection cls and
+    combines the masks
+    
+    values must be a numpy array
+    Like the instance check, the nominal types are checked first and each type is only checked
+    against the values that are not already decided by the previous types, so that e.g.
+    Intersection[int, Ge[0]] never compares strings with 0
+    """
+    mask = None
+    for t in cls.__nominaltypes__ + cls.__valuetypes__:
+        if mask is None:
+            mask = check_many(t, values)
+            continue
+        # For a union, the values that are not yet instances are undecided, and for an
+        # intersection, the values that are still instances
+        undecided = _numpy().flatnonzero(mask != union)
+        if not len(undecided):
+            break
+        if len(undecided) == len(mask):
+            mask = check_many(t, values)
+        else:
+            mask[undecided] = check_many(t, values[undecided])
+    return mask
+
+
+def _merge_intervals(types, intersect):
+    """
+    Merges any of the given types that describe intervals of values, e.g. Ge[0] and Lt[10],
+    into a single type and returns the new set of types
+    """
+    if sum(1 for t in types if getattr(t, '__intervals__', None) is not None) < 2:
+        return types
+    # The interval types are defined in terms of the types in this module
+    from .comparison import merge_intervals
+    return merge_intervals(types, intersect)
+
+
+def _reduce_type(cls):
+    """
+    Reducer registered with copyreg for all veripy metaclasses, which delegates to the
+    __reduce__ method of the metaclass
+    """
+    return type(cls).__reduce__(cls)
+
+
+def _freeze(params):
+    """
+    Returns a hashable version of the given parameters, where slices are replaced by tuples
+    """
+    if not isinstance(params, tuple):
+        return params
+    return tuple((p.start, p.stop) if isinstance(p, slice) else p for p in params)
+
+
+def _reconstruct(origin, params):
+    """
+    Reconstructs a parameterised type when it is unpickled
+    
+    The type is looked up in the intern table using the pickled parameters, so they only need
+    to be validated and normalised by __getitem__ the first time the type is unpickled
+    """
+    return intern_table.lookup((_reconstruct, origin, _freeze(params)), lambda: origin[params])
+
 
 class TypeMeta(type):
     """
     Base class for typing metaclasses providing common functionality
+    
+    Parameterised types have an __origin__, which is the type that was parameterised, and a
+    __params__ method that returns the parameters that were used
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Pickle looks up reducers for classes by the type of the class, i.e. the metaclass
+        copyreg.pickle(cls, _reduce_type)
+    
     def __init__(self, *args, **kwargs):
         pass
+    
+    def __reduce__(self):
+        """
+        Reduces a type for pickling
+        
+        Parameterised types are pickled as their origin and parameters, so no class dict is
+        copied, and unpickling gives the canonical (i.e. interned) class
+        Other types are pickled by reference as usual
+        """
+        origin = self.__dict__.get('__origin__')
+        if origin is None:
+            return self.__qualname__
+        return _reconstruct, (origin, self.__params__())
+    
+    def check_many(self, values):
+        """
+        Returns a mask indicating which of the given values are instances of this type
+        
+        See the module-level check_many for details
+        """
+        arr = as_array(values)
+        if arr is not None:
+            return _numpy().fromiter((isinstance(v, self) for v in arr.tolist()), bool,
+                                     len(arr))
+        return [isinstance(v, self) for v in values]
+    
+    def first_failure(self, values):
+        """
+        Returns the index of the first of the given values that is not an instance of this type,
+        or None if all the values are instances
+        """
+        return first_failure(self, values)
+
+
+class Dispatcher:
+    """
+    Routes values to the handlers for the members of a union
+    
+    The handler for a value is chosen as follows:
+    
+      * If the class of the value, or a class in its MRO, is a key of handlers, the handler
+        for the most specific class is used
+      * Otherwise, the first key of handlers, in order, that the value is an instance of is
+        used
+      * Otherwise, default is used if it is given, or a TypeError is raised
+    
+    The handlers are resolved once for each concrete class of value, so routing a value
+    is usually a single dict lookup
+    Keys that inspect the value, e.g. comparisons, are checked on every call, in order
+    """
+    __slots__ = ('union', 'handlers', 'default', '_exact', '_table', '_cachetoken')
+    
+    def __init__(self, union, handlers, default = None):
+        self.union = union
+        self.handlers = tuple(handlers.items())
+        self.default = default
+        for t, _ in self.handlers:
+            if not isinstance(t, type):
+                raise TypeError('Handler keys must be types')
+            if t not in union.__uniontypes__ and not issubclass(t, union):
+                raise TypeError('%s is not a member of %s' % (t.__name__, union.__name__))
+        # Handlers for plain classes, which are found by walking the MRO
+        self._exact = dict((t, h) for t, h in self.handlers if type(t) is type)
+        # The resolved handlers for each concrete class
+        self._table = {}
+        self._cachetoken = abc.get_cache_token()
+    
+    def __repr__(self):
+        return 'Dispatcher(%s, %s)' % (self.union.__name__,
+                                       ', '.join(t.__name__ for t, _ in self.handlers))
+    
+    def resolve(self, cls):
+        """
+        Returns the handler for instances of cls, or a tuple of (type, handler) pairs that
+        must be checked in order against each value
+        """
+        for base in cls.__mro__:
+            if base in self._exact:
+                return self._exact[base]
+        candidates = []
+        for t, h in self.handlers:
+            if is_nominal(t):
+                if issubclass(cls, t):
+                    # Any later handlers are never reached for instances of cls
+                    if not candidates:
+                        return h
+                    candidates.append((object, h))
+                    break
+            else:
+                candidates.append((t, h))
+        return tuple(candidates)
+    
+    def __call__(self, instance, *args, **kwargs):
+        cls = type(instance)
+        # ABCs can gain virtual subclasses at any time, so the table is rebuilt when the ABC
+        # cache token changes
+        if self._cachetoken != abc.get_cache_token():
+            self._table.clear()
+            self._cachetoken = abc.get_cache_token()
+        if instance.__class__ is not cls:
+            # isinstance also looks at instance.__class__, e.g. for proxies, so the handlers
+            # are checked in order against the instance
+            handler = self.handlers
+        else:
+            try:
+                handler = self._table[cls]
+            except KeyError:
+                handler = self.resolve(cls)
+                if len(self._table) < INSTANCE_CACHE_SIZE:
+                    self._table[cls] = handler
+        if type(handler) is tuple:
+            for t, h in handler:
+                if isinstance(instance, t):
+                    handler = h
+                    break
+            else:
+                handler = self.default
+        if handler is None:
+            raise TypeError('No handler for %s in %s' % (repr(cls), repr(self)))
+        return handler(instance, *args, **kwargs)
 
 
 class UnionMeta(TypeMeta):
@@ -29,8 +594,6 @@ class UnionMeta(TypeMeta):
             types = (types, )
         if not types:
             raise TypeError('Cannot create a union of no types')
-        # Reduce the given types to the minimum inclusive set
-        uniontypes = set()
         # Expand any union types in types as we go
         # This means we know we only have a single level of unions
         def expand_unions():
@@ -38,36 +601,49 @@ class UnionMeta(TypeMeta):
                 if isinstance(t, UnionMeta):
                     if not t.__uniontypes__:
                         raise TypeError('Cannot use unparameterised union')
-                    yield from t.__uniontypes__
+                    yield from t.__unionorder__
                 else:
                     yield t
+        # The order in which the types were given, which is the order that they are checked in
+        given = []
         # Check if each type in the expanded set is OK
-        for t1 in expand_unions():
+        for t in expand_unions():
             # We allow None instead of NoneType
-            if t1 is None: t1 = type(None)
+            if t is None: t = type(None)
             # Apart from None, type arguments have to be types
-            if not isinstance(t1, type):
+            if not isinstance(t, type):
                 raise TypeError('Cannot parameterise union with non-type argument')
-            # Check it against the types we already have
-            for t2 in set(uniontypes):
-                # If the new type is a subclass of a type we already have, we can skip it
-                if issubclass(t1, t2):
-                    break
-                # If the new type is a parent of a type we already have, throw that type away
-                if issubclass(t2, t1):
-                    uniontypes.discard(t2)
-            else:
-                # This only gets run if the loop exits normally (i.e. not via break)
-                uniontypes.add(t1)
+            given.append(t)
+        # Reduce the given types to the minimum inclusive set
+        uniontypes = set(_reduce_types(given, True))
+        # Merge any comparisons that describe intervals into a single set of intervals
+        uniontypes = _merge_intervals(uniontypes, False)
         # If there is only one type left, that is not a union
         if len(uniontypes) == 1:
             return next(iter(uniontypes))
-        name = '%s[%s]' % (self.__name__, ', '.join(t.__name__ for t in uniontypes))
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__uniontypes__ = frozenset(uniontypes)
-        return cls
+        uniontypes = frozenset(uniontypes)
+        ordered = _in_order(uniontypes, given)
+        def make_union():
+            name = '%s[%s]' % (self.__name__, ', '.join(t.__name__ for t in ordered))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__uniontypes__ = uniontypes
+            cls.__unionorder__ = ordered
+            cls.__cost__ = max(map(cost, ordered))
+            _init_instance_cache(cls, ordered)
+            # Dispatchers created by dispatch, keyed by their handlers
+            cls.__dispatchers__ = {}
+            return cls
+        # Unions with the same types in a different order are equal, but they are not the
+        # same type, since they check their types in a different order
+        return intern_table.lookup((self, ordered), make_union)
+    
+    def __params__(self):
+        return self.__unionorder__
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, UnionMeta):
             return NotImplemented
         return self.__uniontypes__ == other.__uniontypes__
@@ -79,7 +655,51 @@ class UnionMeta(TypeMeta):
         if not self.__uniontypes__:
             raise TypeError('Cannot use unparameterised union')
         # An object is an instance of a union if it is an instance of any of the types in the union
-        return any(isinstance(instance, t) for t in self.__uniontypes__)
+        # The nominal types are checked first, since the result for them is cached
+        if _nominal_instancecheck(self, instance, any):
+            return True
+        return any(isinstance(instance, t) for t in self.__valuetypes__)
+    
+    def match(self, handlers, default = None):
+        """
+        Returns a dispatcher that calls the handler for the member of this union that a value
+        belongs to, i.e. match({ A : fa, B : fb })(x) calls fa(x) if x is an A
+        
+        Each key of handlers must be a member of the union or a subclass of one
+        See Dispatcher for how a handler is chosen
+        """
+        if not self.__uniontypes__:
+            raise TypeError('Cannot use unparameterised union')
+        return Dispatcher(self, handlers, default)
+    
+    def dispatch(self, instance, handlers, default = None):
+        """
+        Calls the handler for the member of this union that instance belongs to, and returns
+        the result
+        
+        This is equivalent to match(handlers, default)(instance), except that the dispatcher
+        is reused for equal handlers
+        Calling a dispatcher returned by match directly avoids looking it up
+        """
+        try:
+            key = (tuple(handlers.items()), default)
+            dispatcher = self.__dispatchers__[key]
+        except TypeError:
+            # The handlers are not hashable
+            return self.match(handlers, default)(instance)
+        except KeyError:
+            dispatcher = self.match(handlers, default)
+            if len(self.__dispatchers__) < INSTANCE_CACHE_SIZE:
+                self.__dispatchers__[key] = dispatcher
+        return dispatcher(instance)
+    
+    def check_many(self, values):
+        if not self.__uniontypes__:
+            raise TypeError('Cannot use unparameterised union')
+        arr = as_array(values)
+        if arr is None:
+            return super().check_many(values)
+        return _combine_masks(self, arr, True)
     
     def __subclasscheck__(self, cls):
         if not self.__uniontypes__:
@@ -89,19 +709,24 @@ class UnionMeta(TypeMeta):
             # in cls also belong in this union
             if not cls.__uniontypes__:
                 raise TypeError('Cannot use unparameterised union')
-            return all(issubclass(t, self) for t in cls.__uniontypes__)
+            return all(is_subtype(t, self) for t in cls.__uniontypes__)
         else:
             # If cls is not another union, then it is a subclass of this union if it is a subclass
             # of one of our union types
-            return any(issubclass(cls, t) for t in self.__uniontypes__)
+            return any(is_subtype(cls, t) for t in self.__uniontypes__)
 
 
 class Union(metaclass = UnionMeta):
     """
     Parameterisable type for union (or sum) types
+    
+    The members of a union are checked in the order that they were given, with the types
+    whose results are cached checked first
+    Use match or dispatch to route a value to a handler for the member it belongs to
     """
 
     __uniontypes__ = None
+    __unionorder__ = ()
     
     
 class IntersectionMeta(TypeMeta):
@@ -116,8 +741,6 @@ class IntersectionMeta(TypeMeta):
             types = (types, )
         if not types:
             raise TypeError('Cannot create an intersection of no types')
-        # Reduce the given types to the minimum inclusive set
-        intersecttypes = set()
         # Expand any intersection types in types as we go
         # This means we know we only have a single level of intersections
         def expand_intersections():
@@ -128,33 +751,42 @@ class IntersectionMeta(TypeMeta):
                     yield from t.__intersecttypes__
                 else:
                     yield t
+        given = []
         # Check if each type in the expanded set is OK
-        for t1 in expand_intersections():
+        for t in expand_intersections():
             # We allow None instead of NoneType
-            if t1 is None: t1 = type(None)
+            if t is None: t = type(None)
             # Apart from None, type arguments have to be types
-            if not isinstance(t1, type):
+            if not isinstance(t, type):
                 raise TypeError('Cannot parameterise intersection with non-type argument')
-            # Check it against the types we already have
-            for t2 in set(intersecttypes):
-                # If we already have a more specific type, skip the new type
-                if issubclass(t2, t1):
-                    break
-                # Discard any types that are more general than the new type
-                if issubclass(t1, t2):
-                    intersecttypes.discard(t2)
-            else:
-                # This only gets run if the loop exits normally (i.e. not via break)
-                intersecttypes.add(t1)
+            given.append(t)
+        # Reduce the given types to the most specific set
+        intersecttypes = set(_reduce_types(given, False))
+        # Merge any comparisons that describe intervals into a single interval
+        intersecttypes = _merge_intervals(intersecttypes, True)
         # If there is only one type left, that is not a intersection
         if len(intersecttypes) == 1:
             return next(iter(intersecttypes))
-        name = '%s[%s]' % (self.__name__, ', '.join(t.__name__ for t in intersecttypes))
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__intersecttypes__ = frozenset(intersecttypes)
-        return cls
+        intersecttypes = frozenset(intersecttypes)
+        def make_intersection():
+            # The members are checked in order of cost, so that cheap checks can reject a value
+            # before expensive ones are run
+            ordered = sorted(_in_order(intersecttypes, given), key = cost)
+            name = '%s[%s]' % (self.__name__, ', '.join(t.__name__ for t in ordered))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__intersecttypes__ = intersecttypes
+            cls.__cost__ = max(map(cost, ordered))
+            _init_instance_cache(cls, ordered)
+            return cls
+        return intern_table.lookup((self, intersecttypes), make_intersection)
+    
+    def __params__(self):
+        return tuple(self.__intersecttypes__)
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, IntersectionMeta):
             return NotImplemented
         return self.__intersecttypes__ == other.__intersecttypes__
@@ -167,7 +799,21 @@ class IntersectionMeta(TypeMeta):
             raise TypeError('Cannot use unparameterised intersection')
         # An object is an instance of an intersection if it is an instance of all of
         # the types in the intersection
-        return all(isinstance(instance, t) for t in self.__intersecttypes__)
+        # The nominal types are checked first, since the result for them is cached
+        if not _nominal_instancecheck(self, instance, all):
+            return False
+        return all(isinstance(instance, t) for t in self.__valuetypes__)
+    
+    def check_many(self, values):
+        if not self.__intersecttypes__:
+            raise TypeError('Cannot use unparameterised intersection')
+        # Masks are only combined for arrays - elsewhere, the instance check for each value
+        # must be able to stop at the first failure, e.g. Intersection[int, Ge[0]] must not
+        # compare a string with 0
+        arr = as_array(values)
+        if arr is None:
+            return super().check_many(values)
+        return _combine_masks(self, arr, False)
     
     def __subclasscheck__(self, cls):
         if not self.__intersecttypes__:
@@ -178,13 +824,13 @@ class IntersectionMeta(TypeMeta):
             if not cls.__intersecttypes__:
                 raise TypeError('Cannot use unparameterised intersection')
             for t1 in self.__intersecttypes__:
-                if all(not issubclass(t2, t1) for t2 in cls.__intersecttypes__):
+                if all(not is_subtype(t2, t1) for t2 in cls.__intersecttypes__):
                     return False
             return True
         else:
             # If cls is not another intersection, then it is a subclass of this intersection
             # if it is a subclass of all of our intersection types
-            return all(issubclass(cls, t) for t in self.__intersecttypes__)
+            return all(is_subtype(cls, t) for t in self.__intersecttypes__)
 
 
 class Intersection(metaclass = IntersectionMeta):
@@ -5,9 +5,9 @@ an instance check
 @author: Matt Pryor <mkjpryor@gmail.com>
 """
 
-import operator, collections
+import operator, collections, itertools, functools, bisect
 
-from ..types import TypeMeta
+from ..types import TypeMeta, intern_table, as_array, _numpy
 from .structural import Callable
 
 
@@ -15,25 +15,78 @@ from .structural import Callable
 Predicate = Callable[object, bool]
 
 
+def _memoise(pred, maxsize):
+    """
+    Returns a function that calls pred, remembering the results for up to maxsize of the most
+    recently used hashable values
+    
+    Values of different types are cached separately, e.g. 1 and True
+    """
+    cached = functools.lru_cache(maxsize, typed = True)(pred)
+    def check(instance):
+        try:
+            hash(instance)
+        except TypeError:
+            return pred(instance)
+        return cached(instance)
+    check.cache_info = cached.cache_info
+    check.cache_clear = cached.cache_clear
+    return check
+
+
 class SatisfiesMeta(TypeMeta):
     """
     Metaclass for Satisfies
     """
     
-    def __getitem__(self, pred):
+    # Predicates can do anything, so they are checked after the other members of intersections
+    __cost__ = 4
+    
+    def __getitem__(self, params):
         if self.__predicate__:
             raise TypeError('Cannot re-parameterise an existing satisfies type')
+        if not isinstance(params, tuple):
+            params = (params, )
+        pred, *options = params
         if not isinstance(pred, Predicate):
-            raise TypeError('Satisfies expects a single predicate')
-        name = '%s[...]' % self.__name__
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__predicate__ = pred
-        return cls
+            raise TypeError('Satisfies expects a predicate')
+        # Options are given as slices, e.g. 'maxsize' : 128
+        maxsize, declared = None, None
+        for o in options:
+            if not isinstance(o, slice) or o.start not in ('maxsize', 'cost'):
+                raise TypeError("Satisfies options must be 'maxsize' or 'cost'")
+            if o.start == 'maxsize':
+                maxsize = o.stop
+            else:
+                declared = o.stop
+        def make_satisfies():
+            name = '%s[...]' % self.__name__
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__predicate__ = pred
+            cls.__maxsize__ = maxsize
+            # The function used to check values, which remembers the results if maxsize is given
+            cls.__check__ = pred if maxsize is None else _memoise(pred, maxsize)
+            if declared is not None:
+                cls.__cost__ = declared
+            return cls
+        return intern_table.lookup((self, pred, maxsize, declared), make_satisfies)
+    
+    def __params__(self):
+        params = (self.__predicate__, )
+        if self.__maxsize__ is not None:
+            params += (slice('maxsize', self.__maxsize__), )
+        if '__cost__' in self.__dict__:
+            params += (slice('cost', self.__cost__), )
+        return params
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, SatisfiesMeta):
             return NotImplemented
-        return self.__predicate__ == other.__predicate__
+        return self.__predicate__ == other.__predicate__ and \
+               self.__maxsize__ == other.__maxsize__
     
     def __hash__(self):
         return hash(self.__predicate__)
@@ -41,7 +94,7 @@ class SatisfiesMeta(TypeMeta):
     def __instancecheck__(self, instance):
         if not self.__predicate__:
             raise TypeError('Cannot use unparameterised satisfies type')
-        return self.__predicate__(instance)
+        return self.__check__(instance)
     
     def __subclasscheck__(self, cls):
         return False
@@ -50,8 +103,14 @@ class SatisfiesMeta(TypeMeta):
 class Satisfies(metaclass = SatisfiesMeta):
     """
     Parameterisable type that tests if an object satisfies a predicate as an isinstance check
+    
+    The results for hashable values can be remembered by giving the maximum number of values
+    to remember, e.g. Satisfies[is_prime, 'maxsize' : 1024]
+    Predicates are checked after the other members of intersections, unless they declare a
+    lower cost, e.g. Satisfies[is_positive, 'cost' : 1]
     """
     __predicate__ = None
+    __maxsize__   = None
 
 
 class ComparisonMeta(TypeMeta):
@@ -59,6 +118,8 @@ class ComparisonMeta(TypeMeta):
     Metaclass for comparison types
     """
     
+    __cost__ = 1
+    
     def __new__(cls, name, bases, ns, operator = None):
         self = super().__new__(cls, name, bases, ns)
         self.__operator__ = operator
@@ -67,37 +128,63 @@ class ComparisonMeta(TypeMeta):
     def __getitem__(self, val):
         if self.__hasvalue__:
             raise TypeError('Cannot re-parameterise an existing comparison type')
-        name = '%s[%s]' % (self.__name__, val)
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__), self.__operator__)
-        cls.__hasvalue__ = True
-        cls.__value__ = val
-        return cls
+        def make_comparison():
+            name = '%s[%s]' % (self.__name__, val)
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__), self.__operator__)
+            cls.__origin__ = self
+            cls.__hasvalue__ = True
+            cls.__value__ = val
+            # Ordering comparisons also describe an interval of values
+            if self.__operator__ in _INTERVALS:
+                cls.__intervals__ = (_INTERVALS[self.__operator__](val), )
+            return cls
+        # The type of the value is part of the key so that, e.g., Eq[1] and Eq[True] are
+        # kept separate
+        return intern_table.lookup((self, type(val), val), make_comparison)
+    
+    def __params__(self):
+        return self.__value__
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, ComparisonMeta):
             return NotImplemented
-        return self.__class__ == other.__class__ and \
+        # All comparison types share a metaclass, so they are distinguished by their operator
+        return self.__operator__ is other.__operator__ and \
                self.__hasvalue__ == other.__hasvalue__ and \
                self.__value__ == other.__value__
     
     def __hash__(self):
-        return hash(self.__hasvalue__) ^ hash(self.__value__)
+        return hash(self.__operator__) ^ hash(self.__hasvalue__) ^ hash(self.__value__)
     
     def __instancecheck__(self, instance):
         if not self.__hasvalue__:
             raise TypeError('Cannot use unparameterised comparison type')
         return self.__operator__(instance, self.__value__)
     
+    def check_many(self, values):
+        if not self.__hasvalue__:
+            raise TypeError('Cannot use unparameterised comparison type')
+        arr = as_array(values)
+        # For arrays, the operator is applied to the whole array in one go
+        if arr is not None:
+            return self.__operator__(arr, self.__value__)
+        return list(map(bool, map(self.__operator__, values, itertools.repeat(self.__value__))))
+    
     def __subclasscheck__(self, cls):
-        return False
+        # Comparisons that describe intervals are subclasses if their interval is contained
+        # in ours
+        return _interval_subclasscheck(self, cls)
 
 
 class Eq(metaclass = ComparisonMeta, operator = operator.eq):
     """
     Parameterisable type for equality testing, i.e. isinstance(x, Eq[10]) is equivalent to x == 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
 
 
 class Ne(metaclass = ComparisonMeta, operator = operator.ne):
@@ -105,8 +192,9 @@ class Ne(metaclass = ComparisonMeta, operator = operator.ne):
     Parameterisable type for non-equality testing, i.e. isinstance(x, Ne[10]) is equivalent
     to x != 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
 
 
 class Ge(metaclass = ComparisonMeta, operator = operator.ge):
@@ -114,8 +202,9 @@ class Ge(metaclass = ComparisonMeta, operator = operator.ge):
     Parameterisable type that tests if an object is >= another, i.e. isinstance(x, Ge[10])
     is equivalent to x >= 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
     
     
 class Gt(metaclass = ComparisonMeta, operator = operator.gt):
@@ -123,8 +212,9 @@ class Gt(metaclass = ComparisonMeta, operator = operator.gt):
     Parameterisable type that tests if an object is > another, i.e. isinstance(x, Gt[10])
     is equivalent to x > 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
     
     
 class Le(metaclass = ComparisonMeta, operator = operator.le):
@@ -132,8 +222,9 @@ class Le(metaclass = ComparisonMeta, operator = operator.le):
     Parameterisable type that tests if an object is <= another, i.e. isinstance(x, Le[10])
     is equivalent to x <= 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
     
     
 class Lt(metaclass = ComparisonMeta, operator = operator.lt):
@@ -141,5 +232,258 @@ class Lt(metaclass = ComparisonMeta, operator = operator.lt):
     Parameterisable type that tests if an object is < another, i.e. isinstance(x, Lt[10])
     is equivalent to x < 10
     """
-    __hasvalue__ = False
-    __value__    = None
+    __hasvalue__  = False
+    __value__     = None
+    __intervals__ = None
+
+
+class Interval(collections.namedtuple('Interval', ['lo', 'lo_closed', 'hi', 'hi_closed'])):
+    """
+    An interval of values between lo and hi
+    
+    A bound of None means that the interval is unbounded in that direction
+    lo_closed and hi_closed indicate whether the bounds themselves are in the interval
+    """
+    __slots__ = ()
+    
+    def __str__(self):
+        return '%s%s, %s%s' % ('[' if self.lo_closed else '(',
+                               '-inf' if self.lo is None else self.lo,
+                               'inf' if self.hi is None else self.hi,
+                               ']' if self.hi_closed else ')')
+    
+    def is_empty(self):
+        """
+        Returns True if there are no values in the interval
+        """
+        if self.lo is None or self.hi is None:
+            return False
+        if self.lo == self.hi:
+            return not (self.lo_closed and self.hi_closed)
+        return self.lo > self.hi
+    
+    def contains(self, value):
+        """
+        Returns True if the given value is in the interval
+        """
+        if self.lo is not None:
+            if not (value >= self.lo if self.lo_closed else value > self.lo):
+                return False
+        if self.hi is not None:
+            if not (value <= self.hi if self.hi_closed else value < self.hi):
+                return False
+        return True
+    
+    def contains_many(self, arr):
+        """
+        Returns a numpy mask indicating which of the values in the given numpy array are in
+        the interval
+        """
+        numpy = _numpy()
+        mask = numpy.ones(len(arr), dtype = bool)
+        if self.lo is not None:
+            numpy.logical_and(mask, arr >= self.lo if self.lo_closed else arr > self.lo, out = mask)
+        if self.hi is not None:
+            numpy.logical_and(mask, arr <= self.hi if self.hi_closed else arr < self.hi, out = mask)
+        return mask
+
+
+# The interval described by the value of each ordering comparison
+_INTERVALS = {
+    operator.ge : lambda v: Interval(v, True, None, False),
+    operator.gt : lambda v: Interval(v, False, None, False),
+    operator.le : lambda v: Interval(None, False, v, True),
+    operator.lt : lambda v: Interval(None, False, v, False),
+}
+
+
+def _compare_lower(a, b):
+    """
+    Compares the lower bounds of two intervals, where a lower bound that includes more values
+    comes first
+    """
+    if a.lo is None or b.lo is None:
+        return (b.lo is None) - (a.lo is None)
+    if a.lo < b.lo:
+        return -1
+    if b.lo < a.lo:
+        return 1
+    return b.lo_closed - a.lo_closed
+
+
+def _intersect(a, b):
+    """
+    Returns the intersection of two intervals, which may be empty
+    """
+    # Take the most restrictive of each bound, where an open bound is more restrictive
+    # than a closed bound with the same value
+    if a.lo is None or (b.lo is not None and (b.lo > a.lo or (b.lo == a.lo and not b.lo_closed))):
+        lo, lo_closed = b.lo, b.lo_closed
+    else:
+        lo, lo_closed = a.lo, a.lo_closed
+    if a.hi is None or (b.hi is not None and (b.hi < a.hi or (b.hi == a.hi and not b.hi_closed))):
+        hi, hi_closed = b.hi, b.hi_closed
+    else:
+        hi, hi_closed = a.hi, a.hi_closed
+    return Interval(lo, lo_closed, hi, hi_closed)
+
+
+def normalise_intervals(intervals):
+    """
+    Returns the smallest sorted tuple of disjoint, non-empty intervals that contains the same
+    values as the given intervals
+    
+    The bounds must be comparable with each other, otherwise a TypeError is raised
+    """
+    merged = []
+    for i in sorted((i for i in intervals if not i.is_empty()),
+                    key = functools.cmp_to_key(_compare_lower)):
+        if merged:
+            last = merged[-1]
+            # Because the intervals are sorted, i overlaps or touches the last interval unless
+            # it starts after the last interval ends
+            if last.hi is None or i.lo is None or i.lo < last.hi or \
+               (i.lo == last.hi and (last.hi_closed or i.lo_closed)):
+                # Extend the last interval to the least restrictive upper bound
+                if last.hi is not None and (i.hi is None or i.hi > last.hi or \
+                                            (i.hi == last.hi and i.hi_closed)):
+                    merged[-1] = Interval(last.lo, last.lo_closed, i.hi, i.hi_closed)
+                continue
+        merged.append(i)
+    return tuple(merged)
+
+
+def intersect_intervals(a, b):
+    """
+    Returns the normalised intersection of two collections of intervals
+    """
+    return normalise_intervals(_intersect(i, j) for i in a for j in b)
+
+
+def _interval_subclasscheck(self, cls):
+    """
+    Returns True if self and cls both describe intervals and the intervals of cls are
+    contained in the intervals of self
+    """
+    if self.__intervals__ is None:
+        return False
+    intervals = getattr(cls, '__intervals__', None)
+    if intervals is None:
+        return False
+    try:
+        return intersect_intervals(intervals, self.__intervals__) == \
+                   normalise_intervals(intervals)
+    except TypeError:
+        # The bounds are not comparable
+        return False
+
+
+def merge_intervals(types, intersect):
+    """
+    Merges those of the given types that describe intervals into a single Intervals type,
+    using either the union or the intersection of the intervals, and returns the new set
+    of types
+    
+    If the bounds of the intervals cannot be compared, or the merged intervals are unbounded,
+    the types are returned unchanged
+    """
+    types = set(types)
+    merging = [t for t in types if getattr(t, '__intervals__', None) is not None]
+    if len(merging) < 2:
+        return types
+    try:
+        if intersect:
+            intervals = merging[0].__intervals__
+            for t in merging[1:]:
+                intervals = intersect_intervals(intervals, t.__intervals__)
+        else:
+            intervals = normalise_intervals(i for t in merging for i in t.__intervals__)
+    except TypeError:
+        return types
+    # An unbounded interval would not compare the value with anything, so it would accept
+    # values that the comparisons reject, e.g. None
+    if any(i.lo is None and i.hi is None for i in intervals):
+        return types
+    types.difference_update(merging)
+    types.add(Intervals[intervals])
+    return types
+
+
+class IntervalsMeta(TypeMeta):
+    """
+    Metaclass for the Intervals type
+    """
+    
+    __cost__ = 1
+    
+    def __getitem__(self, intervals):
+        if self.__intervals__ is not None:
+            raise TypeError('Cannot re-parameterise an existing intervals type')
+        if isinstance(intervals, Interval):
+            intervals = (intervals, )
+        if not all(isinstance(i, Interval) for i in intervals):
+            raise TypeError('Cannot parameterise intervals type with non-interval argument')
+        intervals = normalise_intervals(intervals)
+        def make_intervals():
+            name = '%s[%s]' % (self.__name__, ', '.join(str(i) for i in intervals))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__intervals__ = intervals
+            # The lower bounds used to find the interval that may contain a value by bisection
+            cls.__lowerbounds__ = [i.lo for i in intervals]
+            return cls
+        return intern_table.lookup((self, intervals), make_intervals)
+    
+    def __params__(self):
+        return self.__intervals__
+    
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, IntervalsMeta):
+            return NotImplemented
+        return self.__intervals__ == other.__intervals__
+    
+    def __hash__(self):
+        return hash(self.__intervals__)
+    
+    def __instancecheck__(self, instance):
+        intervals = self.__intervals__
+        if intervals is None:
+            raise TypeError('Cannot use unparameterised intervals type')
+        if len(intervals) < 2:
+            return bool(intervals) and intervals[0].contains(instance)
+        # Find the last interval whose lower bound is not greater than instance - this is
+        # the only interval that can contain it
+        # Only the first interval can be unbounded below, in which case it is skipped
+        lows = self.__lowerbounds__
+        i = bisect.bisect_right(lows, instance, 0 if lows[0] is not None else 1) - 1
+        return i >= 0 and intervals[i].contains(instance)
+    
+    def check_many(self, values):
+        if self.__intervals__ is None:
+            raise TypeError('Cannot use unparameterised intervals type')
+        arr = as_array(values)
+        if arr is None:
+            return super().check_many(values)
+        numpy = _numpy()
+        mask = numpy.zeros(len(arr), dtype = bool)
+        for i in self.__intervals__:
+            numpy.logical_or(mask, i.contains_many(arr), out = mask)
+        return mask
+    
+    def __subclasscheck__(self, cls):
+        return _interval_subclasscheck(self, cls)
+
+
+class Intervals(metaclass = IntervalsMeta):
+    """
+    Parameterisable type for values that lie in one of a set of intervals, e.g.
+    Intervals[Interval(0, True, 10, False)] is equivalent to 0 <= x < 10
+    
+    Unions and intersections of ordering comparisons (i.e. Ge, Gt, Le and Lt) and intervals
+    are merged into a single intervals type, so checking a union of many intervals takes
+    O(log n) comparisons
+    This assumes that the values being compared are totally ordered
+    """
+    __intervals__ = None
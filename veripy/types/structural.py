@@ -5,11 +5,12 @@ object has a particular structure
 @author: Matt Pryor <mkjpryor@gmail.com>
 """
 
-import collections
-from types import MappingProxyType, MethodType
-from inspect import signature, Signature as S, Parameter as P
+import array, collections, collections.abc, operator, weakref
+from types import MappingProxyType, MethodType, FunctionType
+from inspect import signature, unwrap, Signature as S, Parameter as P
 
-from ..types import TypeMeta
+from ..types import TypeMeta, intern_table, check_many, first_failure, is_nominal, is_subtype, \
+                    as_array, _numpy
 
 
 class TupleMeta(TypeMeta):
@@ -17,6 +18,9 @@ class TupleMeta(TypeMeta):
     Metaclass for the Tuple type
     """
     
+    # The cost of an instance check, relative to other types (see veripy.types.cost)
+    __cost__ = 2
+    
     def __getitem__(self, types):
         if self.__tupletypes__:
             raise TypeError('Cannot re-parameterise an existing tuple')
@@ -42,13 +46,22 @@ class TupleMeta(TypeMeta):
                 yield t.__name__
             if not strict:
                 yield "..." 
-        name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__tupletypes__ = tuple(tupletypes)
-        cls.__strict__ = strict
-        return cls
+        tupletypes = tuple(tupletypes)
+        def make_tuple():
+            name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__tupletypes__ = tupletypes
+            cls.__strict__ = strict
+            return cls
+        return intern_table.lookup((self, tupletypes, strict), make_tuple)
+    
+    def __params__(self):
+        return self.__tupletypes__ + (() if self.__strict__ else (Ellipsis, ))
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, TupleMeta):
             return NotImplemented
         return self.__strict__ == other.__strict__ and self.__tupletypes__ == other.__tupletypes__
@@ -86,7 +99,7 @@ class TupleMeta(TypeMeta):
         if self.__strict__:
             if not cls.__strict__ or len(self.__tupletypes__) != len(cls.__tupletypes__):
                 return False
-        return all(issubclass(t1, t2) for t1, t2 in zip(cls.__tupletypes__, self.__tupletypes__))
+        return all(is_subtype(t1, t2) for t1, t2 in zip(cls.__tupletypes__, self.__tupletypes__))
 
 
 class Tuple(metaclass = TupleMeta):
@@ -98,11 +111,170 @@ class Tuple(metaclass = TupleMeta):
     __strict__     = True
     
     
+# The Python type of the elements of an array.array with each typecode
+_TYPECODE_TYPES = dict([(c, int) for c in 'bBhHiIlLqQ'] + [(c, float) for c in 'fd'] + [('u', str)])
+
+
+def _all_instances(values, t):
+    """
+    Returns True if all the values in the given container are instances of t
+    """
+    if isinstance(values, array.array) and is_nominal(t):
+        return not values or issubclass(_TYPECODE_TYPES[values.typecode], t)
+    if as_array(values) is not None:
+        return first_failure(t, values) is None
+    # For nominal types, only the distinct types of the values need to be checked
+    if is_nominal(t):
+        return all(issubclass(c, t) for c in set(map(type, values)))
+    return all(isinstance(v, t) for v in values)
+
+
+class IterableMeta(TypeMeta):
+    """
+    Metaclass for the homogeneous iterable types, i.e. List, Sequence and Iterable
+    """
+    
+    # The cost of an instance check, relative to other types (see veripy.types.cost)
+    __cost__ = 3
+    
+    def __getitem__(self, t):
+        if self.__elementtype__ is not None:
+            raise TypeError('Cannot re-parameterise an existing iterable type')
+        if t is None:
+            t = type(None)
+        if not isinstance(t, type):
+            raise TypeError('Cannot parameterise iterable type with non-type argument')
+        def make_iterable():
+            name = '%s[%s]' % (self.__name__, t.__name__)
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__elementtype__ = t
+            return cls
+        return intern_table.lookup((self, t), make_iterable)
+    
+    def __params__(self):
+        return self.__elementtype__
+    
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, IterableMeta):
+            return NotImplemented
+        return self.__container__ is other.__container__ and \
+               self.__elementtype__ == other.__elementtype__
+    
+    def __hash__(self):
+        return hash(self.__container__) ^ hash(self.__elementtype__)
+    
+    def __instancecheck__(self, instance):
+        if not isinstance(instance, self.__container__):
+            return False
+        if self.__elementtype__ is None:
+            return True
+        # Iterators cannot be checked without consuming them, so their elements are only
+        # checked if they are wrapped (see wrap)
+        if isinstance(instance, collections.abc.Iterator):
+            return True
+        return _all_instances(instance, self.__elementtype__)
+    
+    def __subclasscheck__(self, cls):
+        if not isinstance(cls, IterableMeta):
+            # Other classes are only subclasses of unparameterised iterable types
+            return self.__elementtype__ is None and issubclass(cls, self.__container__)
+        if not issubclass(cls.__container__, self.__container__):
+            return False
+        if self.__elementtype__ is None:
+            return True
+        return cls.__elementtype__ is not None and \
+               is_subtype(cls.__elementtype__, self.__elementtype__)
+    
+    def wrap(self, value):
+        """
+        If value is an iterator, returns an iterator over the same elements that raises a
+        TypeError when it reaches an element that is not of the element type, otherwise
+        returns value unchanged
+        
+        This is used by verify to check iterators lazily, in a single pass, as they are consumed
+        """
+        if self.__elementtype__ is None or not isinstance(value, collections.abc.Iterator):
+            return value
+        return self._check_elements(value)
+    
+    def _check_elements(self, iterator):
+        t = self.__elementtype__
+        for i, v in enumerate(iterator):
+            if not isinstance(v, t):
+                raise TypeError("Incorrect type for element %d - "
+                                "expected %s ; got: %s" % (i, repr(t), repr(type(v))))
+            yield v
+    
+    
+class Iterable(metaclass = IterableMeta):
+    """
+    Parameterisable type for iterables whose elements are all of the same type, e.g.
+    Iterable[int] means an iterable of ints
+    
+    Containers are checked eagerly, using the dtype or typecode of numpy arrays and array.array
+    where possible
+    The elements of iterators are not checked by isinstance, since that would consume them, but
+    when used as an annotation with verify they are checked lazily as they are consumed
+    """
+    __container__   = collections.abc.Iterable
+    __elementtype__ = None
+    
+    
+class Sequence(metaclass = IterableMeta):
+    """
+    Parameterisable type for sequences whose elements are all of the same type, e.g.
+    Sequence[int] means a sequence of ints
+    """
+    __container__   = collections.abc.Sequence
+    __elementtype__ = None
+    
+    
+class List(metaclass = IterableMeta):
+    """
+    Parameterisable type for lists whose elements are all of the same type, e.g. List[int]
+    means a list of ints
+    """
+    __container__   = list
+    __elementtype__ = None
+    
+    
+def _dict_checker(recordtypes, strict):
+    """
+    Returns a function that checks whether a dict matches the given record types, fetching
+    all the values in one go
+    """
+    n = len(recordtypes)
+    types = tuple(recordtypes.values())
+    if n == 1:
+        key, = recordtypes
+        getvalues = lambda d: (d[key], )
+    else:
+        getvalues = operator.itemgetter(*recordtypes)
+    def check(d):
+        if len(d) != n if strict else len(d) < n:
+            return False
+        try:
+            values = getvalues(d)
+        except KeyError:
+            return False
+        return all(map(isinstance, values, types))
+    return check
+
+
 class RecordMeta(TypeMeta):
     """
     Metaclass for the Record type
     """
     
+    # The cost of an instance check, relative to other types (see veripy.types.cost)
+    __cost__ = 2
+    
+    # Indicates whether values are checked lazily (see LazyRecord)
+    __lazy__ = False
+    
     def __getitem__(self, types):
         if self.__recordtypes__:
             raise TypeError('Cannot re-parameterise an existing record')
@@ -133,22 +305,38 @@ class RecordMeta(TypeMeta):
                 yield "%s: %s" % (k, t.__name__ )
             if not strict:
                 yield "..." 
-        name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__recordtypes__ = MappingProxyType(recordtypes)
-        cls.__strict__ = strict
-        return cls
+        def make_record():
+            name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__recordtypes__ = MappingProxyType(recordtypes)
+            cls.__strict__ = strict
+            # Plain dicts are checked using a plan compiled from the record types
+            cls.__dictcheck__ = _dict_checker(recordtypes, strict)
+            return cls
+        return intern_table.lookup((self, tuple(recordtypes.items()), strict), make_record)
+    
+    def __params__(self):
+        params = tuple(slice(k, t) for k, t in self.__recordtypes__.items())
+        return params + (() if self.__strict__ else (Ellipsis, ))
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, RecordMeta):
             return NotImplemented
-        return self.__strict__ == other.__strict and self.__recordtypes__ == other.__recordtypes__
+        return self.__lazy__ == other.__lazy__ and self.__strict__ == other.__strict__ and \
+               self.__recordtypes__ == other.__recordtypes__
     
     def __hash__(self):
+        if not self.__recordtypes__:
+            return hash(self.__strict__)
         return hash(self.__strict__) ^ hash(frozenset(self.__recordtypes__.items()))
     
     def __instancecheck__(self, instance):
-        if not isinstance(instance, collections.Mapping):
+        if type(instance) is dict and self.__recordtypes__:
+            return self.__dictcheck__(instance)
+        if not isinstance(instance, collections.abc.Mapping):
             return False
         if not self.__recordtypes__:
             return True
@@ -162,9 +350,60 @@ class RecordMeta(TypeMeta):
         except LookupError:
             return False
     
+    def validate_many(self, rows):
+        """
+        Generator that yields (index, row) for each of the given rows that is not an instance
+        of this record type
+        
+        Rows are consumed lazily, so this can be used as one stage of a pipeline
+        """
+        # Plain dicts use the compiled plan, anything else uses the full instance check
+        check = self.__dictcheck__ if self.__recordtypes__ and not self.__lazy__ else \
+                    self.__instancecheck__
+        for i, row in enumerate(rows):
+            if not (check(row) if type(row) is dict else isinstance(row, self)):
+                yield i, row
+    
+    def validate_columns(self, columns):
+        """
+        Returns a mask indicating which rows of a batch of columns, i.e. a mapping of keys to
+        equal-length columns of values, are instances of this record type
+        
+        Each column is checked against its type in a single pass, so no row mappings are built
+        If numpy is available, the mask is a numpy array of bools and numpy arrays and buffers
+        are checked using vectorised operations, otherwise the mask is a list of bools
+        """
+        if not isinstance(columns, collections.abc.Mapping):
+            raise TypeError('Columns must be given as a mapping of keys to columns')
+        lengths = set(len(c) for c in columns.values())
+        if len(lengths) > 1:
+            raise ValueError('All columns must have the same length')
+        nrows = lengths.pop() if lengths else 0
+        recordtypes = self.__recordtypes__ or {}
+        # If the batch does not have the right keys, no row can be valid
+        valid = all(k in columns for k in recordtypes) and \
+                    not (self.__strict__ and recordtypes and len(columns) != len(recordtypes))
+        numpy = _numpy()
+        if not valid or not recordtypes:
+            if numpy is not None:
+                return numpy.full(nrows, valid, dtype = bool)
+            return [valid] * nrows
+        mask = None
+        for k, t in recordtypes.items():
+            column_mask = check_many(t, columns[k])
+            if numpy is not None:
+                if mask is None:
+                    mask = numpy.array(column_mask, dtype = bool)
+                else:
+                    numpy.logical_and(mask, column_mask, out = mask)
+            else:
+                mask = column_mask if mask is None else \
+                           [a and b for a, b in zip(mask, column_mask)]
+        return mask
+    
     def __subclasscheck__(self, cls):
         # A Mapping is a special case
-        if issubclass(cls, collections.Mapping):
+        if issubclass(cls, collections.abc.Mapping):
             return True
         # We only do further checks for other record types
         if not isinstance(cls, RecordMeta):
@@ -174,6 +413,9 @@ class RecordMeta(TypeMeta):
             return True
         if not cls.__recordtypes__:
             return False
+        # Instances of lazy records may have values of any type
+        if cls.__lazy__ and not self.__lazy__:
+            return False
         # Whether strict or non-strict, we must have enough positions to fulfil the expected types
         if len(cls.__recordtypes__) < len(self.__recordtypes__):
             return False
@@ -181,7 +423,7 @@ class RecordMeta(TypeMeta):
             if not cls.__strict__ or len(self.__recordtypes__) != len(cls.__recordtypes__):
                 return False
         try:
-            return all(issubclass(cls.__recordtypes__[k], t) for k, t in self.__recordtypes__.items())
+            return all(is_subtype(cls.__recordtypes__[k], t) for k, t in self.__recordtypes__.items())
         except LookupError:
             return False
 
@@ -196,6 +438,114 @@ class Record(metaclass = RecordMeta):
     """
     __recordtypes__ = None
     __strict__      = True
+
+
+class CheckedMapping(collections.abc.Mapping):
+    """
+    Read-only view of a mapping that checks each value against the type for its key in a lazy
+    record type the first time that it is accessed, raising a TypeError if it does not match
+    """
+    __slots__ = ('mapping', 'record', '_checked')
+    
+    def __init__(self, mapping, record):
+        self.mapping = mapping
+        self.record = record
+        # The keys whose values have already been checked
+        self._checked = set()
+        
+    def __repr__(self):
+        return '%s(%s, %s)' % (self.__class__.__name__, repr(self.mapping), self.record.__name__)
+    
+    def __getitem__(self, key):
+        value = self.mapping[key]
+        if key not in self._checked:
+            t = self.record.__recordtypes__.get(key)
+            if t is not None and not isinstance(value, t):
+                raise TypeError("Incorrect type for key %s - "
+                                "expected %s ; got: %s" % (repr(key), repr(t), repr(type(value))))
+            self._checked.add(key)
+        return value
+    
+    def __contains__(self, key):
+        # The default implementation would fetch the value
+        return key in self.mapping
+    
+    def __iter__(self):
+        return iter(self.mapping)
+    
+    def __len__(self):
+        return len(self.mapping)
+
+
+class CheckedMutableMapping(CheckedMapping, collections.abc.MutableMapping):
+    """
+    View of a mutable mapping that checks values as they are accessed, like CheckedMapping,
+    and checks new values as they are set
+    """
+    __slots__ = ()
+    
+    def __setitem__(self, key, value):
+        t = self.record.__recordtypes__.get(key)
+        if t is not None and not isinstance(value, t):
+            raise TypeError("Incorrect type for key %s - "
+                            "expected %s ; got: %s" % (repr(key), repr(t), repr(type(value))))
+        self.mapping[key] = value
+        self._checked.add(key)
+    
+    def __delitem__(self, key):
+        del self.mapping[key]
+        self._checked.discard(key)
+
+
+class LazyRecordMeta(RecordMeta):
+    """
+    Metaclass for the LazyRecord type
+    """
+    
+    __cost__ = 1
+    __lazy__ = True
+    
+    def __instancecheck__(self, instance):
+        if not isinstance(instance, collections.abc.Mapping):
+            return False
+        if not self.__recordtypes__:
+            return True
+        if isinstance(instance, CheckedMapping) and instance.record is self:
+            return True
+        # Only the keys are checked, without using len, which is expensive for some mappings
+        recordtypes = self.__recordtypes__
+        if not all(k in instance for k in recordtypes):
+            return False
+        if self.__strict__:
+            return all(k in recordtypes for k in instance)
+        return True
+    
+    def wrap(self, value):
+        """
+        If value is a mapping, returns a view of it that checks each value against its type
+        the first time it is accessed, otherwise returns value unchanged
+        """
+        if not isinstance(value, collections.abc.Mapping) or not self.__recordtypes__:
+            return value
+        if isinstance(value, CheckedMapping) and value.record is self:
+            return value
+        if isinstance(value, collections.abc.MutableMapping):
+            return CheckedMutableMapping(value, self)
+        return CheckedMapping(value, self)
+
+
+class LazyRecord(metaclass = LazyRecordMeta):
+    """
+    Parameterisable type for records whose values are checked lazily, for mappings that are
+    large or that load values on demand, e.g. shelves
+    
+    isinstance only checks that the mapping has the declared keys (and, if the record is strict,
+    no others), without fetching any values
+    When used as an annotation with verify, the mapping is wrapped so that each value is checked
+    the first time it is accessed
+    """
+    __recordtypes__ = None
+    __strict__      = True
     
     
 class HasAttrsMeta(TypeMeta):
@@ -203,6 +553,9 @@ class HasAttrsMeta(TypeMeta):
     Metaclass for the HasAttr type
     """
     
+    # The cost of an instance check, relative to other types (see veripy.types.cost)
+    __cost__ = 2
+    
     def __getitem__(self, types):
         if self.__attrtypes__:
             raise TypeError('Cannot re-parameterise an existing structural type')
@@ -222,28 +575,44 @@ class HasAttrsMeta(TypeMeta):
             attrtypes[k] = t
         if not attrtypes:
             raise TypeError('Cannot create an unparameterised structural type')
-        name = '%s[%s]' % (
-            self.__name__, ', '.join("%s: %s" % (k, t.__name__) for k, t in attrtypes.items())
-        )
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__attrtypes__ = MappingProxyType(attrtypes)
-        return cls
+        def make_hasattrs():
+            name = '%s[%s]' % (
+                self.__name__, ', '.join("%s: %s" % (k, t.__name__) for k, t in attrtypes.items())
+            )
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__attrtypes__ = MappingProxyType(attrtypes)
+            cls.__attritems__ = tuple(attrtypes.items())
+            return cls
+        return intern_table.lookup((self, tuple(attrtypes.items())), make_hasattrs)
+    
+    def __params__(self):
+        return tuple(slice(k, t) for k, t in self.__attrtypes__.items())
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, HasAttrsMeta):
             return NotImplemented
         return self.__attrtypes__ == other.__attrtypes__
     
     def __hash__(self):
+        if not self.__attrtypes__:
+            return hash(None)
         return hash(frozenset(self.__attrtypes__.items()))
     
     def __instancecheck__(self, instance):
         if not self.__attrtypes__:
             return True
+        # Each attribute is checked as soon as it is fetched, so that attributes after the
+        # first failure, e.g. properties, are never evaluated
         try:
-            return all(isinstance(getattr(instance, k), t) for k, t in self.__attrtypes__.items())
+            for k, t in self.__attritems__:
+                if not isinstance(getattr(instance, k), t):
+                    return False
         except AttributeError:
             return False
+        return True
     
     def __subclasscheck__(self, cls):
         # We only do checks for other structural types
@@ -255,7 +624,7 @@ class HasAttrsMeta(TypeMeta):
         if not cls.__attrtypes__:
             return False
         try:
-            return all(issubclass(cls.__attrtypes__[k], t) for k, t in self.__attrtypes__.items())
+            return all(is_subtype(cls.__attrtypes__[k], t) for k, t in self.__attrtypes__.items())
         except LookupError:
             return False
 
@@ -268,10 +637,97 @@ class HasAttrs(metaclass = HasAttrsMeta):
     __attrtypes__ = None
     
     
+# Signatures of plain functions, keyed by code object
+# Each entry also stores the fingerprint of the function it was computed for
+_signatures = weakref.WeakKeyDictionary()
+
+
+def _has_signature(f):
+    return hasattr(f, '__signature__')
+
+
+def _unwrap_function(instance):
+    """
+    Returns (f, bound) where f is the plain function that determines the signature of the
+    given callable, or None if there is no such function, and bound is True if the callable
+    is a bound method
+    """
+    bound = isinstance(instance, MethodType)
+    # Wrappers are followed in the same way as inspect.signature
+    f = unwrap(instance.__func__ if bound else instance, stop = _has_signature)
+    return (f if isinstance(f, FunctionType) else None), bound
+
+
+def _fingerprint(f):
+    """
+    Returns a value that changes whenever any of the attributes that determine the signature
+    of the plain function f, apart from its code, change
+    """
+    return (f.__defaults__, f.__kwdefaults__, tuple(f.__annotations__.items()),
+            getattr(f, '__signature__', None))
+
+
+def _function_signature(f, fingerprint):
+    """
+    Returns the signature of the plain function f, using a cached signature if the function
+    has the given fingerprint
+    """
+    try:
+        cached, sig = _signatures[f.__code__]
+        if cached == fingerprint:
+            return sig
+    except KeyError:
+        pass
+    sig = signature(f)
+    _signatures[f.__code__] = (fingerprint, sig)
+    return sig
+
+
+def _signature_matches(cls, sig):
+    """
+    Returns True if a callable with the given signature is an instance of the parameterised
+    callable type cls
+    """
+    # NOTE: If no annotation is present, or the annotation is not None or a type, then
+    #       it is not verified
+    # Check the return annotation
+    # If present, the return type must be covariant with (e.g. at least as restrictive as) cls
+    if sig.return_annotation is not S.empty:
+        returntype = sig.return_annotation
+        if returntype is None:
+            returntype = type(None)
+        if isinstance(returntype, type) and not issubclass(returntype, cls.__returntype__):
+            return False
+    # Get the positional parameters of the function
+    positional = [p for p in sig.parameters.values() \
+                      if p.kind is P.POSITIONAL_ONLY or p.kind is P.POSITIONAL_OR_KEYWORD]
+    # For each expected type, there must be a parameter
+    if len(positional) < len(cls.__argtypes__):
+        return False
+    # If the parameter has a type annotation, it must be contravariant with (e.g. less
+    # restrictive than) the corresponding type from cls
+    for t, p in zip(cls.__argtypes__, positional):
+        a = p.annotation
+        if a is P.empty:
+            continue
+        if a is None:
+            a = type(None)
+        if isinstance(a, type) and not issubclass(t, a):
+            return False
+    # Any remaining positional parameters must have default values
+    if any(p.default is P.empty for p in positional[len(cls.__argtypes__):]):
+        return False
+    # If we get here, we have a match
+    return True
+
+
 class CallableMeta(TypeMeta):
     """
     Metaclass for the Callable type
     """
+    
+    # The cost of an instance check, relative to other types (see veripy.types.cost)
+    __cost__ = 2
 
     def __getitem__(self, types):
         if self.__argtypes__ is not None:
@@ -299,13 +755,24 @@ class CallableMeta(TypeMeta):
             for t in argtypes:
                 yield t.__name__
             yield returntype.__name__
-        name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
-        cls = self.__class__(name, self.__bases__, dict(self.__dict__))
-        cls.__argtypes__ = tuple(argtypes)
-        cls.__returntype__ = returntype
-        return cls
+        argtypes = tuple(argtypes)
+        def make_callable():
+            name = '%s[%s]' % (self.__name__, ', '.join(typenames()))
+            cls = self.__class__(name, self.__bases__, dict(self.__dict__))
+            cls.__origin__ = self
+            cls.__argtypes__ = argtypes
+            cls.__returntype__ = returntype
+            # Verdicts for plain functions, keyed by code object
+            cls.__verdicts__ = weakref.WeakKeyDictionary()
+            return cls
+        return intern_table.lookup((self, argtypes, returntype), make_callable)
+    
+    def __params__(self):
+        return self.__argtypes__ + (self.__returntype__, )
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, CallableMeta):
             return NotImplemented
         return self.__argtypes__ == other.__argtypes__ and \
@@ -315,48 +782,33 @@ class CallableMeta(TypeMeta):
         return hash(self.__argtypes__) ^ hash(self.__returntype__)
     
     def __instancecheck__(self, instance):
-        if not isinstance(instance, collections.Callable):
+        if not isinstance(instance, collections.abc.Callable):
             return False
         # If we are unparameterised, any callable fits
         if self.__argtypes__ is None:
             return True
-        sig = signature(instance)
-        # NOTE: If no annotation is present, or the annotation is not None or a type, then
-        #       it is not verified
-        # Check the return annotation
-        # If present, the return type must be covariant with (e.g. at least as restrictive as) self
-        if sig.return_annotation is not S.empty:
-            returntype = sig.return_annotation
-            if returntype is None:
-                returntype = type(None)
-            if isinstance(returntype, type) and not issubclass(returntype, self.__returntype__):
-                return False            
-        # Get the positional parameters of the function
-        positional = [p for p in sig.parameters.values() \
-                          if p.kind is P.POSITIONAL_ONLY or p.kind is P.POSITIONAL_OR_KEYWORD]
-        # For each expected type, there must be a parameter
-        # If the parameter has a type annotation, it must be contravariant with (e.g. less
-        # restrictive than) the corresponding type from self
-        for t in self.__argtypes__:
-            try:
-                a = positional.pop(0).annotation
-                if a is P.empty:
-                    continue
-                if a is None:
-                    a = type(None)
-                if isinstance(a, type) and not issubclass(t, a):
-                    return False
-            except IndexError:
-                return False
-        # Any remaining positional parameters must have default values
-        if any(p.default is P.empty for p in positional):
-            return False
-        # If we get here, we have a match
-        return True
+        f, bound = _unwrap_function(instance)
+        # Verdicts can only be cached for plain functions
+        if f is None:
+            return _signature_matches(self, signature(instance))
+        fingerprint = _fingerprint(f)
+        try:
+            cached, verdicts = self.__verdicts__[f.__code__]
+        except KeyError:
+            cached = None
+        if cached != fingerprint:
+            # Bound methods share the entry of their function, but have a separate verdict
+            verdicts = [None, None]
+            self.__verdicts__[f.__code__] = (fingerprint, verdicts)
+        if verdicts[bound] is None:
+            sig = signature(instance) if bound or f is not instance else \
+                      _function_signature(f, fingerprint)
+            verdicts[bound] = _signature_matches(self, sig)
+        return verdicts[bound]
     
     def __subclasscheck__(self, cls):
         # Callables are a special case
-        if issubclass(cls, collections.Callable):
+        if issubclass(cls, collections.abc.Callable):
             return True
         # We only do further checks for other callables
         if not isinstance(cls, CallableMeta):
@@ -368,14 +820,14 @@ class CallableMeta(TypeMeta):
         if cls.__argtypes__ is None:
             return False
         # Return type must be covariant (e.g. at least as restrictive) with self
-        if not issubclass(cls.__returntype__, self.__returntype__):
+        if not is_subtype(cls.__returntype__, self.__returntype__):
             return False
         # There must be the same number of types
         if len(cls.__argtypes__) != len(self.__argtypes__):
             return False
         # Each argument type must be contravariant (e.g. less restrictive) with the corresponding
         # type from self
-        return all(issubclass(t1, t2) for t1, t2 in zip(self.__argtypes__, cls.__argtypes__))
+        return all(is_subtype(t1, t2) for t1, t2 in zip(self.__argtypes__, cls.__argtypes__))
 
 
 class Callable(metaclass = CallableMeta):
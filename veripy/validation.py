@@ -0,0 +1,149 @@
+"""
+This module provides validation of values against types that reports where in the value
+each error is, rather than just whether the value is an instance of the type
+
+@author: Matt Pryor <mkjpryor@gmail.com>
+"""
+
+import collections, collections.abc
+
+from .types import IntersectionMeta
+from .types.structural import TupleMeta, RecordMeta, HasAttrsMeta, IterableMeta
+
+
+class Attribute(str):
+    """
+    Path element for an attribute, as opposed to a key or index
+    """
+    __slots__ = ()
+
+
+def format_path(path):
+    """
+    Returns a string representation of a path, e.g. value['x'].y[0]
+    """
+    return 'value' + ''.join('.%s' % p if isinstance(p, Attribute) else '[%r]' % (p, )
+                             for p in path)
+
+
+class Error(collections.namedtuple('Error', ['path', 'expected', 'actual'])):
+    """
+    A validation error
+    
+    path is a tuple of the keys, indices and attributes leading to the invalid value
+    expected is the expected type, or None if no value was expected at all
+    actual is the type of the value, or None if the value is missing
+    """
+    __slots__ = ()
+    
+    def __str__(self):
+        if self.actual is None:
+            return "Missing value for %s - " \
+                   "expected %s" % (format_path(self.path), repr(self.expected))
+        if self.expected is None:
+            return "Unexpected value for %s - " \
+                   "got: %s" % (format_path(self.path), repr(self.actual))
+        return "Incorrect type for %s - " \
+               "expected %s ; got: %s" % (format_path(self.path), repr(self.expected),
+                                          repr(self.actual))
+
+
+class _TooManyErrors(Exception):
+    """
+    Raised to stop validation once the maximum number of errors has been found
+    """
+
+
+class _Errors(list):
+    """
+    List of errors that stops validation when it is full
+    """
+    
+    def __init__(self, max_errors):
+        super().__init__()
+        self.max_errors = max_errors
+        
+    def add(self, path, expected, actual):
+        self.append(Error(path, expected, actual))
+        if self.max_errors is not None and len(self) >= self.max_errors:
+            raise _TooManyErrors()
+
+
+def validate(value, t, collect = True, max_errors = 100):
+    """
+    Validates value against the type t
+    
+    Records, tuples, structural types, intersections and homogeneous containers are walked so
+    that errors can be reported for the individual values they contain
+    
+    If collect is True, a list of up to max_errors errors is returned, which is empty if value
+    is valid, otherwise a TypeError is raised for the first error
+    """
+    if t is None:
+        t = type(None)
+    errors = _Errors(max_errors if collect else 1)
+    try:
+        _walk(value, t, (), errors)
+    except _TooManyErrors:
+        pass
+    if not collect and errors:
+        raise TypeError(str(errors[0]))
+    return errors
+
+
+def _walk(value, t, path, errors):
+    """
+    Adds any errors for value against the type t at the given path to errors
+    """
+    if isinstance(t, RecordMeta) and t.__recordtypes__:
+        if not isinstance(value, collections.abc.Mapping):
+            return errors.add(path, t, type(value))
+        for k, kt in t.__recordtypes__.items():
+            try:
+                v = value[k]
+            except LookupError:
+                errors.add(path + (k, ), kt, None)
+            else:
+                _walk(v, kt, path + (k, ), errors)
+        if t.__strict__ and len(value) != len(t.__recordtypes__):
+            for k in value:
+                if k not in t.__recordtypes__:
+                    errors.add(path + (k, ), None, type(value[k]))
+    elif isinstance(t, TupleMeta) and t.__tupletypes__:
+        if not isinstance(value, tuple):
+            return errors.add(path, t, type(value))
+        for i, et in enumerate(t.__tupletypes__):
+            if i < len(value):
+                _walk(value[i], et, path + (i, ), errors)
+            else:
+                errors.add(path + (i, ), et, None)
+        if t.__strict__:
+            for i in range(len(t.__tupletypes__), len(value)):
+                errors.add(path + (i, ), None, type(value[i]))
+    elif isinstance(t, HasAttrsMeta) and t.__attrtypes__:
+        for k, at in t.__attrtypes__.items():
+            try:
+                v = getattr(value, k)
+            except AttributeError:
+                errors.add(path + (Attribute(k), ), at, None)
+            else:
+                _walk(v, at, path + (Attribute(k), ), errors)
+    elif isinstance(t, IntersectionMeta) and t.__intersecttypes__:
+        # The value must be valid for every type in the intersection, so report the errors
+        # for each of them, in the same order as the instance check
+        # The value types may assume that the nominal types hold, e.g. comparisons, so they
+        # are only walked if all the nominal types are valid
+        for it in t.__nominaltypes__:
+            if not isinstance(value, it):
+                return errors.add(path, it, type(value))
+        for it in t.__valuetypes__:
+            _walk(value, it, path, errors)
+    elif isinstance(t, IterableMeta) and t.__elementtype__ is not None and \
+         isinstance(value, t.__container__) and not isinstance(value, collections.abc.Iterator) and \
+         not isinstance(value, t):
+        # Only invalid containers are walked, to find the invalid elements
+        for i, v in enumerate(value):
+            _walk(v, t.__elementtype__, path + (i, ), errors)
+    elif not isinstance(value, t):
+        # This includes unions, since an error could come from any of the types in the union
+        errors.add(path, t, type(value))